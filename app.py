@@ -1,12 +1,19 @@
-from flask import Flask, request, jsonify, send_from_directory, render_template, Response, stream_with_context
+import time
+BOOT_STARTED = time.perf_counter()
+
+from flask import Flask, request, jsonify, abort, send_from_directory, render_template, Response, stream_with_context, url_for, g
 import os
+import io
+import json
+import re
+import secrets
+from collections import deque
 import logging
 import sys
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-import requests
-from youtubesearchpython import VideosSearch
-from googleapiclient.discovery import build
-import random
 
 # Add the current directory to Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -20,8 +27,18 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Import application modules
-from module.voice import speak, cleanup_old_audio_files, speak_sync
-from module.chat import start_conversation, get_response
+from module.voice import cleanup_old_audio_files, prepare_speech_text, speak_stream_sync, synthesize, transcribe, TTS_TIMEOUT, audio_janitor, tts_cache, load_edge_tts
+from module.chat import start_conversation, get_response, get_response_stream, get_model, EMPTY_REPLY
+from module.sentences import iter_reply_sentences
+from module import runtime, metrics
+from module.session import ChatSessionStore
+from module.admission import llm_limiter, tts_limiter, stt_limiter, Overloaded
+from module.youtube import start_warmup
+from module.music import start_prefetch
+from module.intents import intent_router, remember_reply, resolve_timezone
+from module.phrase_bundle import phrase_bundle
+from module.store import shared_store
+from module.audio_format import AUDIO_FORMATS, NATIVE_FORMAT, available_formats, negotiate, content_filename, mimetype_for_filename
 
 # Load environment variables
 load_dotenv()
@@ -31,74 +48,168 @@ app = Flask(__name__)
 
 # Configure app
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-app.config['UPLOAD_FOLDER'] = os.path.join(current_dir, 'static', 'audio')
+app.config['UPLOAD_FOLDER'] = os.environ.get('AUDIO_DIR', os.path.join(current_dir, 'static', 'audio'))
 app.config['TEMPLATES_AUTO_RELOAD'] = True
+# Let a fronting server that understands X-Sendfile stream audio files itself
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', 'False').lower() == 'true'
+
+# Stream replies sentence by sentence (text and audio) over SSE
+STREAM_REPLIES = os.environ.get('STREAM_REPLIES', 'True').lower() == 'true'
+
+# /api/send_messages: most messages per batch, and sessions worked on at once per batch
+BATCH_MAX_MESSAGES = int(os.environ.get('BATCH_MAX_MESSAGES', 50))
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', 4))
+
+# Reply text for /api/speak_stream is kept server-side under an opaque token, shared
+# by all workers; the URL carries only the token, so the endpoint speaks nothing else
+SPEECH_TOKEN_NAMESPACE = 'speech_token'
+SPEECH_TOKEN_TTL = int(os.environ.get('SPEECH_TOKEN_TTL', 300))
+
+# Reply clips are named after a SHA-256 of their bytes, so a name never changes meaning
+CONTENT_ADDRESSED_AUDIO = re.compile(r'^([0-9a-f]{64})\.[a-z0-9]+$')
+AUDIO_MAX_AGE = 365 * 24 * 60 * 60
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# Initialize chat at startup
-chat = start_conversation()
-
-# Get YouTube API key from environment variables
-YOUTUBE_API_KEY = os.environ.get("YOUTUBE_API_KEY")
-if not YOUTUBE_API_KEY:
-    logger.warning("YouTube API key not found in environment variables. YouTube features may not work.")
-
-RANDOM_MUSIC_QUERIES = [
-    "popular hits",
-    "classic rock",
-    "lofi beats",
-    "jazz classics",
-    "electronic dance",
-    "hip hop",
-    "piano instrumental",
-    "ambient background",
-    "indie pop",
-    "workout motivation",
-    "relaxing acoustic",
-    "trending music",
-    "study playlist",
-    "chill vibes"
-]
-
-def search_youtube(query):
-    try:
-        youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-        request = youtube.search().list(
-            q=query,
-            part='snippet,id',  # Changed from just 'id' to get more metadata
-            type='video',
-            maxResults=5,
-            videoEmbeddable='true'
-        )
-        response = request.execute()
-        items = response.get('items')
-        if not items:
-            return None
-            
-        # Get the first valid result
-        for item in items:
-            video_id = item['id']['videoId']
-            title = item['snippet']['title']
-            channel = item['snippet']['channelTitle']
-            thumbnail = item['snippet']['thumbnails']['medium']['url']
-            
-            return {
-                'url': f"https://www.youtube.com/watch?v={video_id}",
-                'title': title,
-                'channel': channel,
-                'thumbnail': thumbnail,
-                'video_id': video_id
-            }
-        return None
-    except Exception as e:
-        logger.error(f"Error in search_youtube: {e}")
-        return None
+# Old reply clips are deleted in the background rather than on request
+audio_janitor.start()
+
+# Fixed lines are served from pre-rendered clips; a stale bundle is rebuilt in the background
+phrase_bundle.start()
+
+# Prefetch the random music searches so "play music" is served from memory
+start_warmup()
+
+# Fill a few recommendation queues so "recommend a song" doesn't wait on the LLM
+start_prefetch()
+
+# The Gemini and edge_tts clients are imported lazily; load them in the background
+# once the worker is up so neither startup nor the first request waits on them
+PRELOAD_CLIENTS = os.environ.get('PRELOAD_CLIENTS', 'True').lower() == 'true'
+
+def preload_clients():
+    for name, load in (('edge_tts', load_edge_tts), ('gemini', get_model)):
+        started = time.perf_counter()
+        try:
+            load()
+            logger.info(f"Loaded {name} client in {(time.perf_counter() - started) * 1000:.0f} ms")
+        except Exception as e:
+            logger.error(f"Error preloading {name} client: {e}")
+
+if PRELOAD_CLIENTS:
+    threading.Thread(target=preload_clients, name="preload-clients", daemon=True).start()
+
+# One chat per client, created on first message and evicted when idle.
+# Sessions live per worker process, keyed by the SESSION_COOKIE value.
+SESSION_COOKIE = 'jessie_sid'
+SESSION_COOKIE_MAX_AGE = 7 * 24 * 3600
+chat_sessions = ChatSessionStore(
+    start_conversation,
+    max_sessions=int(os.environ.get('MAX_CHAT_SESSIONS', 500)),
+    idle_timeout=int(os.environ.get('CHAT_SESSION_IDLE_SECONDS', 1800)),
+    max_bytes=int(os.environ.get('CHAT_SESSION_MAX_BYTES', 64 * 1024 * 1024))
+)
+
+def get_session_id():
+    """Return the client's session id, issuing a new one if the cookie is missing"""
+    session_id = request.cookies.get(SESSION_COOKIE)
+    if not session_id or len(session_id) > 64:
+        session_id = g.get('new_session_id') or secrets.token_urlsafe(16)
+        g.new_session_id = session_id
+    return session_id
+
+@app.after_request
+def set_session_cookie(response):
+    session_id = g.get('new_session_id')
+    if session_id:
+        response.set_cookie(SESSION_COOKIE, session_id, max_age=SESSION_COOKIE_MAX_AGE,
+                            httponly=True, samesite='Lax')
+    return response
+
+# Sizes that are read when /metrics is scraped
+metrics.Gauge('jessie_chat_sessions', 'Chat sessions held by this worker', lambda: chat_sessions.stats()['sessions'])
+metrics.Gauge('jessie_chat_session_bytes', 'Estimated size of the held chat sessions', lambda: chat_sessions.stats()['bytes'])
+metrics.Gauge('jessie_tts_cache_bytes', 'Size of the on-disk TTS cache', lambda: tts_cache.stats()['bytes'])
+metrics.Gauge('jessie_audio_dir_bytes', 'Size of the per-reply audio clips', lambda: audio_janitor.stats()['bytes'])
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    metrics.start_request()
+
+@app.after_request
+def add_server_timing(response):
+    # Streamed responses only include the stages finished before the headers went out
+    started = g.get('request_started')
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        metrics.request_seconds.observe(elapsed, request.endpoint or 'unknown')
+        timing = metrics.server_timing_header()
+        total = f"total;dur={elapsed * 1000:.1f}"
+        response.headers['Server-Timing'] = f"{timing}, {total}" if timing else total
+    return response
+
+def voiced_reply(data, reply, session_id):
+    """Add a streaming audio URL to a reply that should be spoken, if TTS has room"""
+    if not reply.pop('speak', False):
+        return reply
+    remember_reply(session_id, reply['response'])
+    # Hand the prepared text to the streaming endpoint so playback starts
+    # on the first MP3 chunk instead of after the whole clip is written.
+    # With every TTS slot taken, reply with text only.
+    expressive_text = prepare_speech_text(reply['response'])
+    if expressive_text and tts_limiter.has_capacity():
+        audio_format = negotiate_audio_format(data, streaming=True)
+        reply['audio_stream'] = speech_url(expressive_text, audio_format)
+    return reply
+
+def speech_url(expressive_text, audio_format):
+    """Store the text to speak under a short-lived token and return its streaming URL"""
+    token = secrets.token_urlsafe(16)
+    shared_store.set(SPEECH_TOKEN_NAMESPACE, token, json.dumps({'text': expressive_text, 'format': audio_format}),
+                     ttl=SPEECH_TOKEN_TTL)
+    return url_for('speak_stream', token=token)
+
+def save_audio(filename, content):
+    """Write a synthesized clip to the upload folder and return its URL"""
+    audio_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    with metrics.timed('audio_write'):
+        if os.path.exists(audio_path):
+            # Same content-addressed clip; refresh it so the janitor keeps it around
+            os.utime(audio_path)
+        else:
+            with open(audio_path, 'wb') as f:
+                f.write(content)
+    audio_janitor.track(audio_path, len(content))
+    return f'/static/audio/{filename}'
+
+def negotiate_audio_format(data, streaming=False):
+    """Pick the reply audio format from what the browser says it can play"""
+    client_formats = data.get('audio_formats') if isinstance(data.get('audio_formats'), list) else None
+    return negotiate(client_formats, request.headers.get('Accept'),
+                     save_data=request.headers.get('Save-Data', '').lower() == 'on',
+                     streaming=streaming)
+
+def client_timezone(data):
+    """The browser's timezone from the request body ('timezone' name or 'utc_offset' minutes)"""
+    return resolve_timezone(data.get('timezone'), data.get('utc_offset'))
+
+def sse_event(event):
+    return f"data: {json.dumps(event)}\n\n"
+
+@app.errorhandler(Overloaded)
+def handle_overloaded(e):
+    # Shed load fast instead of letting requests pile up on a saturated upstream
+    logger.warning(f"Rejecting request: {e}")
+    response = jsonify({'response': "Ugh, I'm way too busy right now. Try again in a bit?", 'error': 'overloaded'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', stream_replies=STREAM_REPLIES)
 
 @app.route('/api/send_message', methods=['POST'])
 def send_message():
@@ -111,69 +222,330 @@ def send_message():
         if not message:
             return jsonify({'error': 'Empty message'}), 400
         
-        # --- Music request logic ---
-        if message.lower() == "play music" or message.lower() == "play music ":
-            # Select a random music query
-            random_query = random.choice(RANDOM_MUSIC_QUERIES)
-            youtube_result = search_youtube(random_query)
-            
-            if youtube_result:
-                title = youtube_result.get('title', 'Unknown')
-                channel = youtube_result.get('channel', '')
-                return jsonify({
-                    'response': f"Playing {title}{' by ' + channel if channel else ''} from YouTube!",
-                    'youtube_url': youtube_result['url'],
-                    'youtube_metadata': youtube_result
-                })
-            else:
-                return jsonify({'response': "Sorry, I couldn't find any random music right now."})
-                
-        elif message.lower().startswith("play "):
-            song_query = message[5:]
-            youtube_result = search_youtube(song_query)
-            
-            if youtube_result:
-                title = youtube_result.get('title', song_query)
-                channel = youtube_result.get('channel', '')
-                return jsonify({
-                    'response': f"Playing {title}{' by ' + channel if channel else ''} from YouTube!",
-                    'youtube_url': youtube_result['url'],
-                    'youtube_metadata': youtube_result
-                })
-            else:
-                return jsonify({'response': f"Sorry, I couldn't find '{song_query}' on YouTube."})
+        # Commands and stock phrases are answered without Gemini
+        session_id = get_session_id()
+        intent, reply = intent_router.route(message, session_id, client_timezone(data))
+        if reply:
+            return jsonify(voiced_reply(data, reply, session_id))
 
-        # --- Existing chat logic ---
-        response = get_response(chat, message)
+        with llm_limiter.slot():
+            with chat_sessions.use(session_id) as chat:
+                response = get_response(chat, message)
         if not response:
-            response = "I didn't get that. Try again?"
-        
-        # Generate speech
-        audio_result = speak_sync(response)
-        
-        if audio_result and isinstance(audio_result, dict):
-            filename = audio_result.get("filename")
-            content = audio_result.get("content")
-            
-            if filename and content:
-                audio_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                with open(audio_path, 'wb') as f:
-                    f.write(content)
-                
-                return jsonify({
-                    'response': response,
-                    'audio': f'/static/audio/{filename}'
-                })
+            response = EMPTY_REPLY
         
-        return jsonify({'response': response})
+        return jsonify(voiced_reply(data, {'response': response, 'speak': True}, session_id))
             
+    except Overloaded:
+        raise
     except Exception as e:
         logger.error(f"Error in send_message: {e}")
         return jsonify({'response': "Something went wrong. Try again?"})
 
+@app.route('/api/send_message_stream', methods=['POST'])
+def send_message_stream():
+    """Stream the reply as SSE: each sentence's text as soon as Gemini finishes it,
+    then its audio once synthesized, while later sentences are still generating"""
+    data = request.json
+    if not data or 'message' not in data:
+        return jsonify({'error': 'No message provided'}), 400
+        
+    message = data.get('message', '').strip()
+    if not message:
+        return jsonify({'error': 'Empty message'}), 400
+
+    # Resolve the session before streaming starts so the cookie goes out with the headers
+    session_id = get_session_id()
+    # Per-sentence clips are on the time-to-first-audio path, so skip the transcode (native MP3)
+    audio_format = negotiate_audio_format(data, streaming=True)
+
+    # Routing and admission happen before the stream starts, so overload is still a plain 503
+    intent, reply = intent_router.route(message, session_id, client_timezone(data))
+    if reply:
+        reply = voiced_reply(data, reply, session_id)
+    llm_permit = None if reply else llm_limiter.acquire()
+
+    def generate():
+        try:
+            if reply:
+                yield sse_event({'type': 'reply', **reply})
+                yield sse_event({'type': 'done'})
+                return
+
+            pending = deque()
+
+            def flush(wait):
+                while pending and (wait or pending[0][1].done()):
+                    index, future = pending.popleft()
+                    try:
+                        key_content = future.result(TTS_TIMEOUT)
+                    except Exception as e:
+                        logger.error(f"Error synthesizing segment {index}: {e}")
+                        continue
+                    key, content = key_content
+                    if content:
+                        yield sse_event({'type': 'audio', 'index': index,
+                                         'audio': save_audio(content_filename(content, audio_format), content)})
+
+            def say(index, sentence):
+                yield sse_event({'type': 'text', 'index': index, 'text': sentence})
+                # Only the first sentence gets the random attitude treatment
+                expressive_text = prepare_speech_text(sentence, emo=(index == 0))
+                # Sentences that find every TTS slot taken stay text-only
+                tts_permit = tts_limiter.try_acquire() if expressive_text else None
+                if tts_permit:
+                    future = runtime.submit(synthesize(expressive_text, audio_format))
+                    future.add_done_callback(lambda _, permit=tts_permit: permit.release())
+                    pending.append((index, future))
+                # Send finished clips in order without waiting on the rest
+                yield from flush(wait=False)
+
+            sentences = []
+            with chat_sessions.use(session_id) as chat:
+                reply_chunks = get_response_stream(chat, message)
+                try:
+                    # Fixed lines (e.g. the LLM fallbacks) stay whole so they match the phrase bundle
+                    for sentence in iter_reply_sentences(reply_chunks, phrase_bundle.phrases()):
+                        yield from say(len(sentences), sentence)
+                        sentences.append(sentence)
+                finally:
+                    # On disconnect, let the chat drop its unfinished turn while the session is still held
+                    reply_chunks.close()
+            llm_permit.release()
+
+            if not sentences:
+                sentences.append(EMPTY_REPLY)
+                yield from say(0, EMPTY_REPLY)
+            remember_reply(session_id, " ".join(sentences))
+            yield from flush(wait=True)
+        except Exception as e:
+            logger.error(f"Error in send_message_stream: {e}")
+            yield sse_event({'type': 'error', 'response': "Something went wrong. Try again?"})
+        yield sse_event({'type': 'done'})
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    if llm_permit:
+        # Also covers clients that disconnect before the reply finishes
+        response.call_on_close(llm_permit.release)
+    return response
+
+def answer_message(message, session_id, timezone=None):
+    """Text reply to one batch message, plus whether it should be spoken"""
+    intent, reply = intent_router.route(message, session_id, timezone)
+    if reply:
+        return reply, reply.pop('speak', False)
+    with llm_limiter.slot():
+        with chat_sessions.use(session_id) as chat:
+            response = get_response(chat, message)
+    return {'response': response or EMPTY_REPLY}, True
+
+@app.route('/api/send_messages', methods=['POST'])
+def send_messages():
+    """Answer a batch of messages, streaming one NDJSON line per message as it completes.
+
+    Messages for the same session run in order; different sessions run
+    concurrently (BATCH_CONCURRENCY at a time), and identical replies share
+    one synthesized clip.
+    """
+    data = request.json
+    messages = data.get('messages') if isinstance(data, dict) else None
+    if not isinstance(messages, list) or not messages:
+        return jsonify({'error': 'No messages provided'}), 400
+    if len(messages) > BATCH_MAX_MESSAGES:
+        return jsonify({'error': f'At most {BATCH_MAX_MESSAGES} messages per batch'}), 413
+
+    default_session_id = get_session_id()
+    audio_format = negotiate_audio_format(data)
+    with_audio = data.get('audio', True) is not False
+    batch_timezone = client_timezone(data)
+
+    # Group by session, keeping each session's messages in order
+    sessions = {}
+    for index, item in enumerate(messages):
+        if not isinstance(item, dict):
+            item = {'message': item}
+        session_id = item.get('session_id')
+        if not isinstance(session_id, str) or not session_id or len(session_id) > 64:
+            session_id = default_session_id
+        sessions.setdefault(session_id, []).append((index, item))
+
+    # (result, finished audio future or None), in completion order
+    results = queue.Queue()
+    audio_jobs = {}
+    audio_lock = threading.Lock()
+
+    def start_audio(text):
+        """Future for a reply's clip, shared by every identical reply in the batch"""
+        with audio_lock:
+            future = audio_jobs.get(text)
+            if future is None:
+                expressive_text = prepare_speech_text(text)
+                # Replies that find every TTS slot taken stay text-only
+                tts_permit = tts_limiter.try_acquire() if expressive_text else None
+                if not tts_permit:
+                    return None
+                future = audio_jobs[text] = runtime.submit(synthesize(expressive_text, audio_format))
+                future.add_done_callback(lambda _, permit=tts_permit: permit.release())
+            return future
+
+    def add_audio(result, future):
+        """Save a finished clip and link it from the result (on the request thread)"""
+        try:
+            key, content = future.result()
+            if content:
+                result['audio'] = save_audio(content_filename(content, audio_format), content)
+        except Exception as e:
+            logger.error(f"Error synthesizing batch reply {result['index']}: {e}")
+        return result
+
+    def run_session(session_id, items):
+        for index, item in items:
+            result = {'index': index, 'id': item.get('id')}
+            message = str(item.get('message') or '').strip()
+            if not message:
+                results.put(({**result, 'error': 'Empty message'}, None))
+                continue
+            try:
+                # A message may carry its own timezone; otherwise the batch's applies
+                timezone = client_timezone(item) if 'timezone' in item or 'utc_offset' in item else batch_timezone
+                reply, spoken = answer_message(message, session_id, timezone)
+            except Overloaded as e:
+                results.put(({**result, 'error': 'overloaded', 'retry_after': e.retry_after}, None))
+                continue
+            except Exception as e:
+                logger.error(f"Error in send_messages item {index}: {e}")
+                results.put(({**result, 'response': "Something went wrong. Try again?"}, None))
+                continue
+            result.update(reply)
+            future = None
+            if spoken:
+                remember_reply(session_id, reply['response'])
+                if with_audio:
+                    future = start_audio(reply['response'])
+            if future:
+                # The next message for this session doesn't wait on this one's audio. The
+                # callback runs on the event loop, so it only queues; the clip is saved in generate()
+                future.add_done_callback(lambda done, result=result: results.put((result, done)))
+            else:
+                results.put((result, None))
+
+    def generate():
+        executor = ThreadPoolExecutor(max_workers=min(BATCH_CONCURRENCY, len(sessions)),
+                                      thread_name_prefix='batch')
+        try:
+            for session_id, items in sessions.items():
+                executor.submit(run_session, session_id, items)
+            for _ in range(len(messages)):
+                try:
+                    result, future = results.get(timeout=TTS_TIMEOUT + llm_limiter.wait_timeout + 60)
+                except queue.Empty:
+                    logger.error("Timed out waiting for batch results")
+                    yield json.dumps({'error': 'timeout'}) + "\n"
+                    return
+                if future:
+                    result = add_audio(result, future)
+                yield json.dumps(result) + "\n"
+            yield json.dumps({'done': True, 'count': len(messages)}) + "\n"
+        finally:
+            # A client that disconnects stops sessions that haven't started yet
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/speak_stream')
+def speak_stream():
+    token = request.args.get('token', '')
+    stored = shared_store.get(SPEECH_TOKEN_NAMESPACE, token) if token else None
+    if not stored:
+        return jsonify({'error': 'Unknown or expired speech token'}), 404
+    speech = json.loads(stored)
+    text = speech['text']
+
+    audio_format = speech.get('format', NATIVE_FORMAT)
+    if audio_format not in available_formats():
+        audio_format = NATIVE_FORMAT
+
+    tts_permit = tts_limiter.acquire()
+
+    def generate():
+        try:
+            yield from speak_stream_sync(text, audio_format)
+        finally:
+            tts_permit.release()
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype=AUDIO_FORMATS[audio_format]['mimetype'],
+        headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'}
+    )
+    # A stream that never starts never runs generate()'s finally
+    response.call_on_close(tts_permit.release)
+    return response
+
+def read_upload():
+    """Return (bytes, MIME type) of an uploaded clip, read in chunks as it arrives"""
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('audio')
+        if not upload:
+            return None, None
+        return upload.read(), upload.mimetype
+    # Raw bodies may use chunked transfer encoding, so there's no length up front
+    body = io.BytesIO()
+    while True:
+        chunk = request.stream.read(64 * 1024)
+        if not chunk:
+            break
+        body.write(chunk)
+        if body.tell() > app.config['MAX_CONTENT_LENGTH']:
+            abort(413)
+    return body.getvalue(), request.mimetype
+
+@app.route('/api/transcribe', methods=['POST'])
+def transcribe_audio():
+    """Speech to text for browsers without the Web Speech API"""
+    content, content_type = read_upload()
+    if not content:
+        return jsonify({'error': 'No audio provided'}), 400
+
+    try:
+        with stt_limiter.slot():
+            return jsonify(transcribe(content, content_type))
+    except Overloaded:
+        raise
+    except ValueError as e:
+        logger.error(f"Unsupported audio upload: {e}")
+        return jsonify({'error': 'Unsupported audio format'}), 415
+    except Exception as e:
+        logger.error(f"Error in transcribe: {e}")
+        return jsonify({'error': 'Transcription failed'}), 500
+
 @app.route('/static/audio/<path:filename>')
 def serve_audio(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    # conditional=True answers If-None-Match with 304 and Range with 206;
+    # the file body goes out through wsgi.file_wrapper (sendfile under gunicorn)
+    match = CONTENT_ADDRESSED_AUDIO.match(filename)
+    if not match:
+        return send_from_directory(app.config['UPLOAD_FOLDER'], filename,
+                                   mimetype=mimetype_for_filename(filename), conditional=True)
+    response = send_from_directory(app.config['UPLOAD_FOLDER'], filename,
+                                   mimetype=mimetype_for_filename(filename), conditional=True,
+                                   etag=match.group(1), max_age=AUDIO_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Values are per worker process; each gunicorn worker reports its own
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/cleanup', methods=['POST'])
 def cleanup():
@@ -187,6 +559,10 @@ def cleanup():
         logger.error(f"Error in cleanup: {e}")
         return jsonify({'error': str(e)}), 500
 
+STARTUP_SECONDS = time.perf_counter() - BOOT_STARTED
+metrics.Gauge('jessie_startup_seconds', 'Time to import and set up the app in this worker', lambda: STARTUP_SECONDS)
+logger.info(f"App ready in {STARTUP_SECONDS * 1000:.0f} ms")
+
 if __name__ == "__main__":
     # Get port from environment variable or use default
     port = int(os.environ.get("PORT", 8080))  # Changed default from 5000 to 8080
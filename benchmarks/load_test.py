@@ -0,0 +1,243 @@
+# benchmarks/load_test.py
+"""Offline load test for the /api/send_message hot path.
+
+Gemini, edge_tts and the YouTube API are replaced by local stand-ins
+(benchmarks/stubs.py) with configurable latency and payload sizes, and the
+Flask app is driven in-process at a configurable concurrency. Results are
+written as JSON so runs can be compared.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 8 --requests 200
+    python benchmarks/load_test.py --output before.json
+    python benchmarks/load_test.py --compare before.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.append(ROOT_DIR)
+
+import stubs
+
+SCENARIOS = ("chat", "chat_stream", "play", "play_music")
+
+SONGS = ["bohemian rhapsody", "blinding lights", "tum hi ho", "levitating", "kesariya",
+         "shape of you", "believer", "apna bana le", "heat waves", "pasoori"]
+
+CHAT_MESSAGES = ["what's the weather like", "tell me a joke", "help me with python",
+                 "who are you", "what should I eat today", "explain black holes"]
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def rss_mb():
+    """Current resident set size of this process in MB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_chat(client):
+    response = client.post('/api/send_message', json={'message': random.choice(CHAT_MESSAGES)})
+    data = response.get_json()
+    if response.status_code != 200 or not data:
+        return False
+    if data.get('audio_stream'):
+        audio = client.get(data['audio_stream'])
+        ok = audio.status_code == 200 and len(audio.get_data()) > 0
+        audio.close()
+        return ok
+    return 'response' in data
+
+def run_chat_stream(client):
+    response = client.post('/api/send_message_stream', json={'message': random.choice(CHAT_MESSAGES)})
+    body = response.get_data(as_text=True)
+    response.close()
+    return response.status_code == 200 and '"type": "done"' in body
+
+def run_play(client):
+    response = client.post('/api/send_message', json={'message': f"play {random.choice(SONGS)}"})
+    data = response.get_json()
+    return response.status_code == 200 and bool(data and data.get('youtube_url'))
+
+def run_play_music(client):
+    response = client.post('/api/send_message', json={'message': "play music"})
+    data = response.get_json()
+    return response.status_code == 200 and bool(data and data.get('youtube_url'))
+
+RUNNERS = {
+    "chat": run_chat,
+    "chat_stream": run_chat_stream,
+    "play": run_play,
+    "play_music": run_play_music,
+}
+
+def run_scenario(app, name, concurrency, total_requests):
+    runner = RUNNERS[name]
+    calls_before = dict(stubs.CALLS)
+
+    def worker(count):
+        # One client per worker thread, so each behaves like one browser session
+        client = app.test_client()
+        results = []
+        for _ in range(count):
+            start = time.perf_counter()
+            try:
+                ok = runner(client)
+            except Exception as e:
+                logging.getLogger(__name__).error(f"{name} request failed: {e}")
+                ok = False
+            results.append((time.perf_counter() - start, ok))
+        return results
+
+    per_worker = [total_requests // concurrency + (1 if i < total_requests % concurrency else 0)
+                  for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = [item for batch in pool.map(worker, per_worker) for item in batch]
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(duration * 1000 for duration, ok in results if ok)
+    return {
+        "requests": len(results),
+        "errors": sum(1 for _, ok in results if not ok),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "mean_ms": sum(latencies) / len(latencies) if latencies else None,
+        "throughput_rps": len(results) / elapsed if elapsed else None,
+        "rss_mb": rss_mb(),
+        "upstream_calls": {key: stubs.CALLS[key] - calls_before[key] for key in stubs.CALLS},
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+def compare(current, baseline, threshold):
+    """Print metric deltas against a baseline run and return the number of regressions"""
+    regressions = 0
+    print(f"\nComparison against {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    for name, stats in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        for metric, lower_is_better in (("p50_ms", True), ("p95_ms", True), ("p99_ms", True),
+                                        ("throughput_rps", False), ("rss_mb", True)):
+            old, new = before.get(metric), stats.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = change > threshold if lower_is_better else change < -threshold
+            regressions += regressed
+            flag = "  REGRESSION" if regressed else ""
+            print(f"  {name:12s} {metric:15s} {old:10.1f} -> {new:10.1f}  ({change:+.1%}){flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for Jessie Assistant")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of " + ", ".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--llm-latency-ms", type=float, default=stubs.STUB_CONFIG["llm_latency_ms"])
+    parser.add_argument("--reply-sentences", type=int, default=stubs.STUB_CONFIG["reply_sentences"])
+    parser.add_argument("--tts-first-chunk-ms", type=float, default=stubs.STUB_CONFIG["tts_first_chunk_ms"])
+    parser.add_argument("--tts-bytes-per-char", type=int, default=stubs.STUB_CONFIG["tts_bytes_per_char"])
+    parser.add_argument("--youtube-latency-ms", type=float, default=stubs.STUB_CONFIG["youtube_latency_ms"])
+    parser.add_argument("--settle-seconds", type=float, default=3,
+                        help="wait after startup so background warm-ups finish before measuring")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    stubs.STUB_CONFIG.update({
+        "llm_latency_ms": args.llm_latency_ms,
+        "reply_sentences": args.reply_sentences,
+        "tts_first_chunk_ms": args.tts_first_chunk_ms,
+        "tts_bytes_per_char": args.tts_bytes_per_char,
+        "youtube_latency_ms": args.youtube_latency_ms,
+    })
+    random.seed(args.seed)
+
+    # Fake keys so every code path talks to the stand-ins, and scratch audio directories
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ.setdefault("YOUTUBE_API_KEY", "benchmark")
+    scratch_dir = tempfile.mkdtemp(prefix="jessie-bench-")
+    os.environ["AUDIO_DIR"] = scratch_dir
+    os.environ["TTS_CACHE_DIR"] = os.path.join(scratch_dir, "cache")
+    os.environ["STATE_DB_PATH"] = os.path.join(scratch_dir, "state.db")
+    # Fixed-line clips would otherwise be rendered mid-run and counted as TTS calls
+    os.environ["AUDIO_BUNDLE_DIR"] = os.path.join(scratch_dir, "bundle")
+    os.environ["AUDIO_BUNDLE_AUTO_BUILD"] = "False"
+    # Likewise for the recommendation queues' startup LLM calls
+    os.environ["MUSIC_PREFETCH_GENRES"] = "0"
+    stubs.install()
+
+    rss_before_import = rss_mb()
+    import_started = time.perf_counter()
+    from app import app
+    import_seconds = time.perf_counter() - import_started
+    logging.disable(logging.WARNING)
+    time.sleep(args.settle_seconds)
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "stub_config": dict(stubs.STUB_CONFIG),
+            "import_seconds": import_seconds,
+            "rss_mb_before_import": rss_before_import,
+        },
+        "scenarios": {},
+    }
+    for name in scenarios:
+        stats = run_scenario(app, name, args.concurrency, args.requests)
+        results["scenarios"][name] = stats
+        print(f"{name:12s} n={stats['requests']:4d} err={stats['errors']:3d}  "
+              f"p50={stats['p50_ms'] or 0:8.1f}ms  p95={stats['p95_ms'] or 0:8.1f}ms  "
+              f"p99={stats['p99_ms'] or 0:8.1f}ms  {stats['throughput_rps']:7.1f} req/s  "
+              f"rss={stats['rss_mb']:6.1f}MB  upstream={stats['upstream_calls']}")
+
+    output = args.output or os.path.join(BENCH_DIR, "results", datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+# benchmarks/startup.py
+"""Startup cost report: how long a fresh worker takes to import app.py.
+
+Each run imports the app in a new interpreter with `-X importtime`, with API
+keys blanked and client preloading off so nothing touches the network. Reports
+import time, the app's own boot time, the slowest imports and any heavy client
+libraries that were loaded eagerly. Results are written as JSON so releases can
+be compared.
+
+Usage:
+    python benchmarks/startup.py --runs 5
+    python benchmarks/startup.py --output before.json
+    python benchmarks/startup.py --compare before.json
+"""
+import os
+import sys
+import json
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+from statistics import median
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+# Client libraries that should only be imported when first used
+HEAVY_MODULES = ("google.generativeai", "googleapiclient.discovery", "edge_tts", "aiohttp",
+                 "pywhatkit", "speech_recognition", "youtubesearchpython", "numpy", "pydub")
+
+CHILD_CODE = """
+import sys, time, json
+started = time.perf_counter()
+import app
+import_seconds = time.perf_counter() - started
+print(json.dumps({
+    "import_seconds": import_seconds,
+    "startup_seconds": getattr(app, "STARTUP_SECONDS", None),
+    "heavy_modules": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+def parse_importtime(stderr):
+    """Return {module: cumulative microseconds} for the modules app.py imports directly"""
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            cumulative = int(cumulative)
+        except ValueError:
+            continue
+        # Nesting is shown as two spaces per level; level 1 is imported by app itself
+        if (len(name) - len(name.lstrip()) - 1) // 2 == 1:
+            totals[name.strip()] = totals.get(name.strip(), 0) + cumulative
+    return totals
+
+def run_once(env):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD_CODE], cwd=ROOT_DIR,
+                            env=env, capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(f"importing app failed:\n{result.stderr[-2000:]}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report["imports"] = parse_importtime(result.stderr)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup cost report for Jessie Assistant")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to list")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/startup-<timestamp>.json)")
+    parser.add_argument("--compare", help="baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    scratch_dir = tempfile.mkdtemp(prefix="jessie-startup-")
+    env = dict(os.environ, GOOGLE_API_KEY="", YOUTUBE_API_KEY="", PRELOAD_CLIENTS="False",
+               AUDIO_DIR=scratch_dir, TTS_CACHE_DIR=os.path.join(scratch_dir, "cache"),
+               STATE_DB_PATH=os.path.join(scratch_dir, "state.db"),
+               AUDIO_BUNDLE_DIR=os.path.join(scratch_dir, "bundle"), AUDIO_BUNDLE_AUTO_BUILD="False")
+
+    runs = [run_once(env) for _ in range(args.runs)]
+    imports = {}
+    for run in runs:
+        for package, cumulative in run["imports"].items():
+            imports.setdefault(package, []).append(cumulative)
+    slowest = sorted(((median(values) / 1000, package) for package, values in imports.items()), reverse=True)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "runs": args.runs,
+        },
+        "import_ms": median(run["import_seconds"] for run in runs) * 1000,
+        "startup_ms": median(run["startup_seconds"] for run in runs) * 1000 if runs[0]["startup_seconds"] is not None else None,
+        "heavy_modules": runs[0]["heavy_modules"],
+        "slowest_imports_ms": {package: ms for ms, package in slowest[:args.top]},
+    }
+
+    print(f"import app: {results['import_ms']:.1f} ms (median of {args.runs})")
+    if results["startup_ms"] is not None:
+        print(f"app ready:  {results['startup_ms']:.1f} ms after app.py started executing")
+    print(f"heavy modules imported eagerly: {', '.join(results['heavy_modules']) or 'none'}")
+    print("slowest imports:")
+    for package, ms in results["slowest_imports_ms"].items():
+        print(f"  {package:30s} {ms:8.1f} ms")
+
+    output = args.output or os.path.join(BENCH_DIR, "results", datetime.now().strftime("startup-%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = 0
+        for metric in ("import_ms", "startup_ms"):
+            old, new = baseline.get(metric), results.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = change > args.threshold
+            regressions += regressed
+            print(f"  {metric:12s} {old:8.1f} -> {new:8.1f}  ({change:+.1%}){'  REGRESSION' if regressed else ''}")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# benchmarks/stubs.py
+"""Local stand-ins for the upstream services (Gemini, edge_tts, YouTube Data API).
+
+install() puts fake `google.generativeai`, `edge_tts`, `googleapiclient.discovery`
+and `httplib2` modules into sys.modules, so it must run before `app` is imported. Latency and payload sizes come from STUB_CONFIG.
+"""
+import sys
+import time
+import types
+import random
+import asyncio
+import threading
+
+STUB_CONFIG = {
+    "llm_latency_ms": 400,        # time to the first Gemini chunk
+    "llm_chunk_latency_ms": 40,   # time between streamed chunks
+    "reply_sentences": 3,
+    "tts_first_chunk_ms": 250,    # edge_tts time to first audio
+    "tts_chunk_ms": 20,
+    "tts_bytes_per_char": 160,    # ~48 kbit/s MP3 at normal speaking rate
+    "tts_chunk_bytes": 4096,
+    "youtube_latency_ms": 150,
+}
+
+# How many times each upstream was actually called, for cache hit ratios
+CALLS = {"llm": 0, "tts": 0, "youtube": 0}
+_calls_lock = threading.Lock()
+
+SENTENCES = [
+    "Ugh, what the fuck do you even want yaar?",
+    "Seriously, I told you already, matlab samjha karo.",
+    "Fine, here is your stupid answer, take it and go, pagal.",
+    "I am not your personal Google, okay?",
+    "Go outside and touch some grass, bhai.",
+]
+
+def _count(name):
+    with _calls_lock:
+        CALLS[name] += 1
+
+def _sleep_ms(ms):
+    if ms > 0:
+        time.sleep(ms / 1000)
+
+# --- google.generativeai ---
+
+class _Part:
+    def __init__(self, text):
+        self.text = text
+
+class _Content:
+    def __init__(self, role, text):
+        self.role = role
+        self.parts = [_Part(text)]
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+class _StreamedResponse:
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    def __iter__(self):
+        _sleep_ms(STUB_CONFIG["llm_latency_ms"])
+        for index, chunk in enumerate(self._chunks):
+            if index:
+                _sleep_ms(STUB_CONFIG["llm_chunk_latency_ms"])
+            yield _Response(chunk)
+
+class ChatSession:
+    def __init__(self, model, history=None):
+        self.model = model
+        self.history = list(history or [])
+
+    def _reply(self):
+        return " ".join(random.choice(SENTENCES) for _ in range(STUB_CONFIG["reply_sentences"]))
+
+    def send_message(self, message, stream=False, **kwargs):
+        _count("llm")
+        reply = self._reply()
+        self.history.append(_Content("user", message))
+        self.history.append(_Content("model", reply))
+        if stream:
+            # Roughly word-sized chunks, like the real streaming API
+            words = reply.split(" ")
+            return _StreamedResponse([" ".join(words[i:i + 4]) + " " for i in range(0, len(words), 4)])
+        _sleep_ms(STUB_CONFIG["llm_latency_ms"])
+        return _Response(reply)
+
+class GenerativeModel:
+    def __init__(self, model_name, system_instruction=None, **kwargs):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+
+    def start_chat(self, history=None, **kwargs):
+        return ChatSession(self, history)
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        return ChatSession(self).send_message(contents, stream=stream)
+
+    def count_tokens(self, contents):
+        return types.SimpleNamespace(total_tokens=len(str(contents)) // 4)
+
+def _genai_module():
+    module = types.ModuleType("google.generativeai")
+    module.configure = lambda **kwargs: None
+    module.GenerativeModel = GenerativeModel
+    return module
+
+# --- edge_tts ---
+
+class Communicate:
+    def __init__(self, text, voice, **kwargs):
+        self.text = text
+        self.voice = voice
+
+    async def stream(self):
+        _count("tts")
+        total = max(1, len(self.text) * STUB_CONFIG["tts_bytes_per_char"])
+        chunk_size = STUB_CONFIG["tts_chunk_bytes"]
+        await asyncio.sleep(STUB_CONFIG["tts_first_chunk_ms"] / 1000)
+        sent = 0
+        while sent < total:
+            size = min(chunk_size, total - sent)
+            yield {"type": "audio", "data": b"\xff" * size}
+            sent += size
+            await asyncio.sleep(STUB_CONFIG["tts_chunk_ms"] / 1000)
+        yield {"type": "WordBoundary", "offset": 0, "duration": 0, "text": ""}
+
+def _edge_tts_module():
+    module = types.ModuleType("edge_tts")
+    module.Communicate = Communicate
+    return module
+
+# --- googleapiclient / httplib2 ---
+
+class _SearchRequest:
+    def __init__(self, q, **kwargs):
+        self.q = q
+
+    def execute(self, http=None, **kwargs):
+        _count("youtube")
+        _sleep_ms(STUB_CONFIG["youtube_latency_ms"])
+        video_id = f"stub{abs(hash(self.q)) % 10 ** 8:08d}"
+        return {"items": [{
+            "id": {"videoId": video_id},
+            "snippet": {
+                "title": f"{self.q.title()} (Official Video)",
+                "channelTitle": "Stub Channel",
+                "thumbnails": {"medium": {"url": f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg"}},
+            },
+        }]}
+
+class _Search:
+    def list(self, **kwargs):
+        return _SearchRequest(**kwargs)
+
+class _YouTube:
+    def search(self):
+        return _Search()
+
+def _discovery_module():
+    module = types.ModuleType("googleapiclient.discovery")
+    module.build = lambda *args, **kwargs: _YouTube()
+    return module
+
+def _httplib2_module():
+    module = types.ModuleType("httplib2")
+    module.Http = lambda *args, **kwargs: object()
+    return module
+
+def install():
+    """Replace the upstream client libraries with the local stand-ins"""
+    google = sys.modules.get("google") or types.ModuleType("google")
+    google.__path__ = getattr(google, "__path__", [])
+    genai = _genai_module()
+    google.generativeai = genai
+    googleapiclient = types.ModuleType("googleapiclient")
+    googleapiclient.__path__ = []
+    discovery = _discovery_module()
+    googleapiclient.discovery = discovery
+    sys.modules.update({
+        "google": google,
+        "google.generativeai": genai,
+        "edge_tts": _edge_tts_module(),
+        "googleapiclient": googleapiclient,
+        "googleapiclient.discovery": discovery,
+        "httplib2": _httplib2_module(),
+    })
@@ -0,0 +1,154 @@
+# benchmarks/text_pipeline.py
+"""Check the voice text pipeline against the original implementation
+and report per-call cost on long replies.
+
+Usage: python benchmarks/text_pipeline.py [--calls N] [--seed S]
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+logging.disable(logging.WARNING)
+
+from module import voice
+from module.voice import SASSY_PHRASES, INDIAN_SLANG, RUDE_SUFFIXES, INDIAN_PRONUNCIATION
+
+# --- Reference implementation (the original per-rule passes) ---
+
+def legacy_make_emo(text):
+    if not text:
+        return "Whatever the fuck..."
+    original_text = text
+    text = text.lower()
+    for polite, rude in SASSY_PHRASES.items():
+        text = text.replace(polite.lower(), rude)
+    if text != original_text.lower():
+        text = text.capitalize()
+    else:
+        text = original_text
+    if "fuck" not in text.lower() and random.random() > 0.6:
+        if random.random() > 0.5:
+            text = f"Fuck, {text.lower()}"
+        else:
+            words = text.split()
+            insert_pos = min(len(words) - 1, random.randint(1, 3))
+            words.insert(insert_pos, "fucking")
+            text = " ".join(words)
+    if random.random() > 0.6:
+        slang = random.choice(INDIAN_SLANG)
+        if random.random() > 0.5:
+            text = f"{slang}, {text}"
+        else:
+            text = f"{text}, {slang}"
+    if random.random() > 0.5:
+        text += random.choice(RUDE_SUFFIXES)
+    text = text.replace("💀", "").replace("🖤", "").replace("😒", "").replace("🙄", "")
+    text = text.replace("🤣", "").replace("😂", "").replace("😤", "").replace("🙃", "")
+    text = text.replace("❤️", "").replace("👍", "").replace("👎", "").replace("👏", "")
+    return text
+
+def legacy_enhance_indian_pronunciation(text):
+    text = text.replace('"', '').replace('"', '').replace('*', '').replace('_', '')
+    enhanced_words = []
+    for word in text.split():
+        lower_word = word.lower()
+        if lower_word in INDIAN_PRONUNCIATION:
+            if word[0].isupper():
+                enhanced_words.append(INDIAN_PRONUNCIATION[lower_word].capitalize())
+            else:
+                enhanced_words.append(INDIAN_PRONUNCIATION[lower_word])
+        else:
+            enhanced_words.append(word)
+    return ' '.join(enhanced_words)
+
+def legacy_prepare_speech_text(text):
+    text = text.replace('"', '').replace('"', '').replace('*', '').replace('_', '')
+    indian_text = legacy_enhance_indian_pronunciation(legacy_make_emo(text))
+    return indian_text.replace(".", "...").replace("!", "!...").replace("?", "?...")
+
+# --- Corpus ---
+
+FILLER = [
+    "yaar", "Seriously?", "what", "THE", "The", "ok", "OK.", "Okay!", "dumbass", "Dumbass",
+    "thank you", "please", "hello", "Love you", "help", "*really*", "_actually_", '"quoted"',
+    "💀", "❤️", "👍", "bakwas", "the", "because", "However,", "eXample", "music", "song",
+    "people", "problem.", "Probably", "matlab", "is", "you", "Your", "code", "error", "goodbye!"
+]
+
+def make_corpus(count, words, rng):
+    corpus = []
+    for _ in range(count):
+        parts = [rng.choice(FILLER) for _ in range(words)]
+        # Sprinkle irregular whitespace between tokens
+        corpus.append("".join(part + rng.choice([" ", " ", "  ", "\n"]) for part in parts))
+    return corpus
+
+# Typical model replies: mostly lower case, few capitals, no emojis
+REPLIES = [
+    "Ugh, what the fuck do you even want yaar? Seriously, I told you already, matlab samjha karo.",
+    "The weather is fine, go outside and touch some grass, bhai. I am not your personal Google, okay?",
+    "Fine, here is your stupid answer: it is going to rain tomorrow so take an umbrella, pagal.",
+    "BC, you really asked me that? Thank you for wasting my time, dumbass. Hello? Anyone home?",
+    "Matlab, literally everyone knows this. Python is a programming language, not a snake, chutiya.",
+]
+
+def make_replies(count, sentences, rng):
+    return [" ".join(rng.choice(REPLIES) for _ in range(sentences)) for _ in range(count)]
+
+def check_equivalence(corpus, seed):
+    mismatches = 0
+    for index, text in enumerate(corpus):
+        random.seed(seed + index)
+        expected = (legacy_enhance_indian_pronunciation(text), legacy_prepare_speech_text(text))
+        random.seed(seed + index)
+        actual = (voice.enhance_indian_pronunciation(text), voice.prepare_speech_text(text))
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"MISMATCH:\n  input:    {text!r}\n  expected: {expected!r}\n  actual:   {actual!r}")
+    return mismatches
+
+def time_per_call(func, corpus, calls, repeat=5):
+    """Best-of-N average per call, to keep CPU frequency noise out of the comparison"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for index in range(calls):
+            func(corpus[index % len(corpus)])
+        best = min(best, time.perf_counter() - start)
+    return best / calls * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = make_corpus(500, 20, rng) + make_corpus(200, 200, rng) + make_replies(200, 8, rng)
+    mismatches = check_equivalence(corpus, args.seed)
+    print(f"Equivalence: {len(corpus) - mismatches}/{len(corpus)} inputs identical")
+
+    rows = [
+        ("enhance_indian_pronunciation", legacy_enhance_indian_pronunciation, voice.enhance_indian_pronunciation),
+        ("make_emo", legacy_make_emo, voice.make_emo),
+        ("prepare_speech_text", legacy_prepare_speech_text, voice.prepare_speech_text),
+    ]
+    for label, long_texts in (("model-like replies, 8 sentences", make_replies(50, 8, rng)),
+                              ("synthetic worst case, 200 tokens", make_corpus(50, 200, rng))):
+        print(f"\nPer-call cost on {label} ({args.calls} calls):")
+        for name, legacy, current in rows:
+            random.seed(args.seed)
+            before = time_per_call(legacy, long_texts, args.calls)
+            random.seed(args.seed)
+            after = time_per_call(current, long_texts, args.calls)
+            print(f"  {name:30s} legacy {before:8.1f} us   current {after:8.1f} us   {before / after:5.2f}x")
+
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+# gunicorn.conf.py
+# Picked up automatically by `gunicorn app:app` (Procfile and Render start command).
+import os
+
+# Threaded workers: a request waiting on Gemini or edge_tts holds one thread,
+# not a whole process. Keep the per-worker upstream limits in module/admission.py
+# (max concurrent + max waiting) below the thread count.
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 16))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+
+# Long enough for a streamed reply; overload is shed with 503s well before this
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Audio files go out via sendfile() from wsgi.file_wrapper rather than read/write copies
+sendfile = True
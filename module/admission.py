@@ -0,0 +1,131 @@
+# module/admission.py
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+from module import metrics
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class Overloaded(Exception):
+    """Raised when an upstream's concurrency limit and wait queue are both full"""
+
+    def __init__(self, upstream, retry_after):
+        super().__init__(f"{upstream} is at capacity")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+class Permit:
+    """One admitted call; release() is safe to call more than once"""
+
+    def __init__(self, limiter):
+        self._limiter = limiter
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._limiter._release()
+
+class UpstreamLimiter:
+    """Caps concurrent calls to one upstream per worker, with a bounded wait queue.
+
+    Callers beyond max_concurrent wait up to wait_timeout seconds for a slot, but at
+    most max_waiting of them; anyone else is turned away immediately with Overloaded,
+    so a slow upstream can't tie up every worker thread.
+    """
+
+    def __init__(self, name, max_concurrent, max_waiting=0, wait_timeout=0, retry_after=5):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.retry_after = retry_after
+        self._active = 0
+        self._waiting = 0
+        self._rejected = 0
+        self._condition = threading.Condition()
+        metrics.Gauge(f"jessie_{name}_active_calls", f"{name} calls in progress in this worker", lambda: self._active)
+        metrics.Gauge(f"jessie_{name}_waiting_calls", f"{name} calls queued for a slot in this worker", lambda: self._waiting)
+
+    def _reject(self):
+        self._rejected += 1
+        metrics.rejected_calls.inc(self.name)
+        raise Overloaded(self.name, self.retry_after)
+
+    def acquire(self, timeout=None):
+        """Return a Permit, waiting in the queue if needed, or raise Overloaded"""
+        timeout = self.wait_timeout if timeout is None else timeout
+        with self._condition:
+            if self._active < self.max_concurrent:
+                self._active += 1
+                return Permit(self)
+            if self._waiting >= self.max_waiting or timeout <= 0:
+                self._reject()
+            self._waiting += 1
+            deadline = time.monotonic() + timeout
+            try:
+                while self._active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._reject()
+                    self._condition.wait(remaining)
+                self._active += 1
+                return Permit(self)
+            finally:
+                self._waiting -= 1
+
+    def has_capacity(self):
+        """True if a call could start right now without queueing"""
+        return self._active < self.max_concurrent
+
+    def try_acquire(self):
+        """Return a Permit if a slot is free right now, otherwise None"""
+        try:
+            return self.acquire(timeout=0)
+        except Overloaded:
+            return None
+
+    def _release(self):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def slot(self, timeout=None):
+        permit = self.acquire(timeout)
+        try:
+            yield
+        finally:
+            permit.release()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'active': self._active,
+                'waiting': self._waiting,
+                'rejected': self._rejected,
+                'max_concurrent': self.max_concurrent,
+                'max_waiting': self.max_waiting
+            }
+
+def _limiter_from_env(name, max_concurrent, max_waiting, wait_timeout, retry_after):
+    prefix = name.upper()
+    return UpstreamLimiter(
+        name,
+        max_concurrent=int(os.environ.get(f"{prefix}_MAX_CONCURRENT", max_concurrent)),
+        max_waiting=int(os.environ.get(f"{prefix}_MAX_WAITING", max_waiting)),
+        wait_timeout=float(os.environ.get(f"{prefix}_WAIT_SECONDS", wait_timeout)),
+        retry_after=int(os.environ.get(f"{prefix}_RETRY_AFTER_SECONDS", retry_after))
+    )
+
+# Per worker process. Keep max_concurrent + max_waiting of the request-path limiters
+# under the gunicorn thread count so queued callers never hold every thread.
+llm_limiter = _limiter_from_env("llm", max_concurrent=6, max_waiting=4, wait_timeout=5, retry_after=5)
+tts_limiter = _limiter_from_env("tts", max_concurrent=8, max_waiting=2, wait_timeout=2, retry_after=2)
+youtube_limiter = _limiter_from_env("youtube", max_concurrent=4, max_waiting=4, wait_timeout=3, retry_after=3)
+stt_limiter = _limiter_from_env("stt", max_concurrent=4, max_waiting=2, wait_timeout=3, retry_after=3)
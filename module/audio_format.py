@@ -0,0 +1,142 @@
+# module/audio_format.py
+import io
+import os
+import hashlib
+import shutil
+import logging
+import threading
+
+from module import metrics
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# edge_tts always produces this; every other format is transcoded from it with pydub
+NATIVE_FORMAT = "mp3"
+
+# name -> extension, MIME type, Accept types that select it, pydub export arguments
+AUDIO_FORMATS = {
+    "opus": {
+        "extension": "webm",
+        "mimetype": "audio/webm",
+        "accept": ("audio/webm",),
+        "export": {"format": "webm", "codec": "libopus", "bitrate": "24k", "parameters": ["-ac", "1"]},
+    },
+    "ogg": {
+        "extension": "ogg",
+        "mimetype": "audio/ogg",
+        "accept": ("audio/ogg", "application/ogg"),
+        "export": {"format": "ogg", "codec": "libopus", "bitrate": "24k", "parameters": ["-ac", "1"]},
+    },
+    "mp3-low": {
+        "extension": "mp3",
+        "mimetype": "audio/mpeg",
+        "accept": (),
+        "export": {"format": "mp3", "bitrate": "32k", "parameters": ["-ac", "1"]},
+    },
+    "mp3": {
+        "extension": "mp3",
+        "mimetype": "audio/mpeg",
+        "accept": ("audio/mpeg", "audio/mp3"),
+        "export": None,
+    },
+}
+
+# Server-side preference order, best first; formats not listed are never offered
+AUDIO_FORMAT_PREFERENCE = [name.strip() for name in
+                           os.environ.get("AUDIO_FORMATS", "opus,ogg,mp3-low,mp3").split(",")
+                           if name.strip() in AUDIO_FORMATS]
+
+AUDIO_EXTENSIONS = tuple(sorted({f".{spec['extension']}" for spec in AUDIO_FORMATS.values()}))
+
+_can_transcode = None
+_transcode_lock = threading.Lock()
+
+def can_transcode():
+    """True if pydub and ffmpeg are both available to decode and re-encode clips"""
+    global _can_transcode
+    with _transcode_lock:
+        if _can_transcode is None:
+            _can_transcode = False
+            try:
+                import pydub  # noqa: F401
+                if shutil.which("ffmpeg") or shutil.which("avconv"):
+                    _can_transcode = True
+                else:
+                    logger.warning("ffmpeg not found. Replies will only be sent as unprocessed MP3.")
+            except ImportError:
+                logger.warning("pydub module not found. Replies will only be sent as unprocessed MP3.")
+        return _can_transcode
+
+def available_formats():
+    """Formats this server can produce: transcoding needs pydub and ffmpeg"""
+    if not can_transcode():
+        return [NATIVE_FORMAT]
+    return [name for name in AUDIO_FORMAT_PREFERENCE if name != NATIVE_FORMAT] + [NATIVE_FORMAT]
+
+def extension_for(audio_format):
+    return AUDIO_FORMATS.get(audio_format, AUDIO_FORMATS[NATIVE_FORMAT])["extension"]
+
+def content_filename(content, audio_format):
+    """Name a reply clip after a digest of its bytes, so one name always serves the same bytes"""
+    return f"{hashlib.sha256(content).hexdigest()}.{extension_for(audio_format)}"
+
+def mimetype_for_filename(filename):
+    extension = os.path.splitext(filename)[1].lstrip(".").lower()
+    for spec in AUDIO_FORMATS.values():
+        if spec["extension"] == extension:
+            return spec["mimetype"]
+    return None
+
+def formats_from_accept(accept_header):
+    """Format names whose MIME types the Accept header lists explicitly (wildcards are ignored)"""
+    accepted = set()
+    for item in (accept_header or "").split(","):
+        media_type, *params = item.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    pass
+        if quality <= 0:
+            continue
+        media_type = media_type.strip().lower()
+        for name, spec in AUDIO_FORMATS.items():
+            if media_type in spec["accept"]:
+                accepted.add(name)
+    return accepted
+
+def negotiate(client_formats=None, accept_header=None, save_data=False, streaming=False):
+    """Pick the output format for a reply.
+
+    client_formats are the format names the browser reported it can play (via
+    canPlayType); without them the Accept header is used. Progressive playback
+    only works for the native MP3 stream, so streamed replies stay native unless
+    the client asked to save data.
+    """
+    offered = set(client_formats or ()) or formats_from_accept(accept_header)
+    # Every browser plays MP3, so it's always an option
+    offered.update(("mp3", "mp3-low"))
+    if streaming and not save_data:
+        return NATIVE_FORMAT
+    candidates = [name for name in available_formats() if name in offered]
+    if save_data:
+        # Smallest first: Opus, then low-bitrate MP3
+        candidates.sort(key=lambda name: name not in ("opus", "ogg", "mp3-low"))
+    return candidates[0] if candidates else NATIVE_FORMAT
+
+def transcode(content, audio_format):
+    """Re-encode native MP3 bytes into audio_format (blocking; run it in a thread)"""
+    spec = AUDIO_FORMATS[audio_format]
+    if spec["export"] is None or not content:
+        return content
+    from pydub import AudioSegment
+    with metrics.timed("transcode"):
+        segment = AudioSegment.from_file(io.BytesIO(content), format=NATIVE_FORMAT)
+        output = io.BytesIO()
+        segment.export(output, **spec["export"])
+        return output.getvalue()
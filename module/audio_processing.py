@@ -0,0 +1,206 @@
+# module/audio_processing.py
+import io
+import os
+import wave
+import logging
+
+from module import metrics
+from module.audio_format import can_transcode
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Energy-based voice activity detection over short frames. A frame counts as
+# speech when it is VAD_MARGIN_DB above the recording's noise floor (and above
+# VAD_MIN_DBFS, so near-digital silence never qualifies).
+VAD_FRAME_MS = int(os.environ.get("VAD_FRAME_MS", 20))
+VAD_MARGIN_DB = float(os.environ.get("VAD_MARGIN_DB", 10))
+VAD_MIN_DBFS = float(os.environ.get("VAD_MIN_DBFS", -50))
+# Speech regions are padded so word onsets and tails aren't clipped, and gaps
+# between them are shortened to at most VAD_MAX_GAP_MS
+VAD_PADDING_MS = int(os.environ.get("VAD_PADDING_MS", 150))
+VAD_MAX_GAP_MS = int(os.environ.get("VAD_MAX_GAP_MS", 300))
+
+# Synthesized clips are tightened and levelled once, before they are cached:
+# edges keep TTS_EDGE_MS of silence, pauses (stretched by the "..." in the
+# expressive text) are capped at TTS_PAUSE_MS, and speech is brought to
+# TTS_TARGET_DBFS without letting peaks exceed TTS_PEAK_DBFS. TTS output has
+# no background noise, so silence is a fixed level rather than a noise floor.
+TTS_POSTPROCESS = os.environ.get("TTS_POSTPROCESS", "True").lower() == "true"
+TTS_SILENCE_DBFS = float(os.environ.get("TTS_SILENCE_DBFS", -45))
+TTS_EDGE_MS = int(os.environ.get("TTS_EDGE_MS", 100))
+TTS_PAUSE_MS = int(os.environ.get("TTS_PAUSE_MS", 350))
+TTS_TARGET_DBFS = float(os.environ.get("TTS_TARGET_DBFS", -18))
+TTS_PEAK_DBFS = float(os.environ.get("TTS_PEAK_DBFS", -1))
+TTS_BITRATE = os.environ.get("TTS_BITRATE", "48k")
+
+# Content-Type subtypes of browser recordings, mapped to ffmpeg format names
+UPLOAD_FORMATS = {
+    "webm": "webm",
+    "ogg": "ogg",
+    "opus": "ogg",
+    "mp4": "mp4",
+    "m4a": "mp4",
+    "x-m4a": "mp4",
+    "aac": "aac",
+    "mpeg": "mp3",
+    "mp3": "mp3",
+    "wav": "wav",
+    "x-wav": "wav",
+    "flac": "flac",
+}
+
+# numpy is imported on first use to keep startup fast
+_numpy = None
+
+def _np():
+    global _numpy
+    if _numpy is None:
+        import numpy
+        _numpy = numpy
+    return _numpy
+
+def _is_wav(content):
+    return content[:4] == b"RIFF" and content[8:12] == b"WAVE"
+
+def load_pcm(content, content_type=None):
+    """Decode an uploaded clip into (mono int16 samples, sample rate); ValueError if it can't be decoded"""
+    np = _np()
+    if _is_wav(content):
+        try:
+            with wave.open(io.BytesIO(content)) as reader:
+                channels = reader.getnchannels()
+                sample_width = reader.getsampwidth()
+                sample_rate = reader.getframerate()
+                frames = reader.readframes(reader.getnframes())
+        except (wave.Error, EOFError) as e:
+            raise ValueError(f"Could not read WAV upload: {e}")
+        if sample_width != 2:
+            raise ValueError(f"Unsupported WAV sample width: {sample_width * 8} bits")
+        samples = np.frombuffer(frames, dtype="<i2")
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+        return samples, sample_rate
+
+    # Browser recordings (WebM/Ogg Opus, MP4) need ffmpeg via pydub
+    try:
+        from pydub import AudioSegment
+    except ImportError:
+        raise ValueError("Only WAV uploads are supported without pydub")
+    # Unknown or generic types (application/octet-stream) are left to ffmpeg to probe
+    subtype = (content_type or "").split(";")[0].strip().lower().split("/")[-1]
+    audio_format = UPLOAD_FORMATS.get(subtype)
+    try:
+        segment = AudioSegment.from_file(io.BytesIO(content), format=audio_format)
+    except Exception as e:
+        raise ValueError(f"Could not decode {content_type or 'upload'}: {e}")
+    segment = segment.set_channels(1).set_sample_width(2)
+    return np.array(segment.get_array_of_samples(), dtype=np.int16), segment.frame_rate
+
+def frame_levels(samples, sample_rate, frame_ms=VAD_FRAME_MS):
+    """RMS level of each frame in dBFS"""
+    np = _np()
+    frame_size = max(1, sample_rate * frame_ms // 1000)
+    frame_count = len(samples) // frame_size
+    if not frame_count:
+        return np.zeros(0)
+    frames = samples[:frame_count * frame_size].astype(np.float32).reshape(frame_count, frame_size)
+    rms = np.sqrt(np.mean(np.square(frames / 32768.0), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+def voiced_frames(levels, threshold_dbfs=None):
+    """Indices of frames loud enough to be speech, by default relative to the noise floor"""
+    np = _np()
+    if threshold_dbfs is None:
+        noise_floor = np.percentile(levels, 10)
+        threshold_dbfs = max(noise_floor + VAD_MARGIN_DB, VAD_MIN_DBFS)
+    return np.flatnonzero(levels > threshold_dbfs)
+
+def detect_speech(samples, sample_rate, frame_ms=VAD_FRAME_MS, padding_ms=VAD_PADDING_MS,
+                  max_gap_ms=VAD_MAX_GAP_MS, threshold_dbfs=None):
+    """Return [(start, end)] sample ranges that contain speech, padded and merged"""
+    np = _np()
+    levels = frame_levels(samples, sample_rate, frame_ms)
+    if not len(levels):
+        return []
+    voiced = voiced_frames(levels, threshold_dbfs)
+    if not len(voiced):
+        return []
+
+    frame_size = max(1, sample_rate * frame_ms // 1000)
+    padding = padding_ms // frame_ms
+    max_gap = max_gap_ms // frame_ms
+    # Runs of consecutive voiced frames, joined across short pauses
+    breaks = np.flatnonzero(np.diff(voiced) > max_gap + 2 * padding)
+    starts = np.concatenate(([voiced[0]], voiced[breaks + 1]))
+    ends = np.concatenate((voiced[breaks], [voiced[-1]]))
+    regions = []
+    for start, end in zip(starts, ends):
+        start = max(0, int(start) - padding) * frame_size
+        end = min(len(samples), (int(end) + 1 + padding) * frame_size)
+        regions.append((start, end))
+    return regions
+
+def trim_silence(samples, sample_rate, padding_ms=VAD_PADDING_MS, max_gap_ms=VAD_MAX_GAP_MS,
+                 threshold_dbfs=None):
+    """Drop leading and trailing silence and shorten long pauses; empty if there's no speech"""
+    np = _np()
+    with metrics.timed("vad"):
+        regions = detect_speech(samples, sample_rate, padding_ms=padding_ms, max_gap_ms=max_gap_ms,
+                                threshold_dbfs=threshold_dbfs)
+        if not regions:
+            return samples[:0]
+        gap = np.zeros(sample_rate * max_gap_ms // 1000, dtype=samples.dtype)
+        pieces = []
+        for start, end in regions:
+            if pieces:
+                pieces.append(gap)
+            pieces.append(samples[start:end])
+        return np.concatenate(pieces)
+
+def normalize_loudness(samples, sample_rate, target_dbfs=TTS_TARGET_DBFS, peak_dbfs=TTS_PEAK_DBFS,
+                       threshold_dbfs=None):
+    """Scale speech to target_dbfs RMS (measured over voiced frames only), keeping peaks under peak_dbfs"""
+    np = _np()
+    if not len(samples):
+        return samples
+    levels = frame_levels(samples, sample_rate)
+    voiced = voiced_frames(levels, threshold_dbfs) if len(levels) else []
+    if not len(voiced):
+        return samples
+    # Average power of the voiced frames, so pauses don't drag the level down
+    speech_dbfs = 10 * np.log10(np.mean(np.power(10.0, levels[voiced] / 10)))
+    peak = np.max(np.abs(samples.astype(np.int32))) / 32768.0
+    gain_db = target_dbfs - speech_dbfs
+    if peak > 0:
+        gain_db = min(gain_db, peak_dbfs - 20 * np.log10(peak))
+    gain = np.power(10.0, gain_db / 20)
+    return np.clip(np.rint(samples * gain), -32768, 32767).astype(np.int16)
+
+def postprocess_clip(content):
+    """Trim excess silence from a synthesized MP3 clip and normalize its loudness.
+
+    Blocking (run it in a thread). The clip comes back as bare MP3 frames, like
+    edge_tts output, so processed clips still join byte for byte; on any
+    problem the original bytes are returned.
+    """
+    if not TTS_POSTPROCESS or not content or not can_transcode():
+        return content
+    try:
+        from pydub import AudioSegment
+        with metrics.timed("tts_postprocess"):
+            samples, sample_rate = load_pcm(content, "audio/mp3")
+            samples = trim_silence(samples, sample_rate, padding_ms=TTS_EDGE_MS, max_gap_ms=TTS_PAUSE_MS,
+                                   threshold_dbfs=TTS_SILENCE_DBFS)
+            if not len(samples):
+                return content
+            samples = normalize_loudness(samples, sample_rate, threshold_dbfs=TTS_SILENCE_DBFS)
+            segment = AudioSegment(samples.tobytes(), frame_rate=sample_rate, sample_width=2, channels=1)
+            output = io.BytesIO()
+            segment.export(output, format="mp3", bitrate=TTS_BITRATE,
+                           parameters=["-write_xing", "0", "-id3v2_version", "0"])
+            return output.getvalue()
+    except Exception as e:
+        logger.error(f"Error post-processing clip, caching it as is: {e}")
+        return content
@@ -1,11 +1,12 @@
 # module/chat.py
 import logging
 import os
-import asyncio
 import sys
 import random
 import time
-import google.generativeai as genai
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Set up logging
@@ -18,7 +19,8 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.append(parent_dir)
 
 # Import local modules
-from module.voice import speak
+from module import metrics
+from module.admission import llm_limiter
 
 # Load environment variables
 load_dotenv()
@@ -28,13 +30,7 @@ api_key = os.environ.get("GOOGLE_API_KEY")
 if not api_key:
     logger.warning("GOOGLE_API_KEY environment variable not set. Gemini AI will not work properly.")
 
-# Initialize genai configuration
-try:
-    genai.configure(api_key=api_key)
-    # Create the model instance
-    model = genai.GenerativeModel('gemini-1.5-flash-8b-latest')
-except Exception as e:
-    logger.error(f"Failed to configure Gemini API: {e}")
+MODEL_NAME = 'gemini-1.5-flash-8b-latest'
 
 # System prompt for consistent persona
 SYSTEM_PROMPT = """You are Jessie, a rude, foul-mouthed Indian teenage girl assistant and you will always talk in hindhi but in english alphabet.
@@ -55,6 +51,147 @@ FALLBACK_RESPONSES = [
     "Ugh, my brain is offline. Try again later."
 ]
 
+# Said when Gemini answers with nothing
+EMPTY_REPLY = "I didn't get that. Try again?"
+
+# Each prompt carries the persona (as the system instruction), a running summary of
+# older turns and the last CONTEXT_KEEP_TURNS exchanges verbatim. Once the history
+# passes CONTEXT_TOKEN_BUDGET, older turns are folded into the summary in the
+# background; past CONTEXT_HARD_LIMIT_TOKENS they are dropped outright.
+CONTEXT_KEEP_TURNS = int(os.environ.get("CONTEXT_KEEP_TURNS", 6))
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", 2000))
+CONTEXT_HARD_LIMIT_TOKENS = int(os.environ.get("CONTEXT_HARD_LIMIT_TOKENS", 2 * CONTEXT_TOKEN_BUDGET))
+SUMMARY_MAX_WORDS = int(os.environ.get("SUMMARY_MAX_WORDS", 150))
+
+SUMMARY_PROMPT = """Summarize this conversation between a user and Jessie, an AI assistant, in at most {words} words of plain English.
+Keep names, facts about the user, preferences, promises and open questions. Leave out greetings and insults.
+
+{previous}{turns}"""
+
+context_tokens = metrics.Histogram("jessie_context_tokens", "Estimated prompt history size per chat turn",
+                                   buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000))
+
+# google.generativeai is slow to import, so the model is created on first use
+_model = None
+_plain_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """Return the Gemini model, importing and configuring the client on first call"""
+    global _model
+    with _model_lock:
+        if _model is None:
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            # The persona goes in as a system instruction rather than a chat turn
+            _model = genai.GenerativeModel(MODEL_NAME, system_instruction=SYSTEM_PROMPT)
+        return _model
+
+def get_plain_model():
+    """Return a persona-free model, for summaries and structured (JSON) output"""
+    global _plain_model
+    get_model()
+    with _model_lock:
+        if _plain_model is None:
+            import google.generativeai as genai
+            _plain_model = genai.GenerativeModel(MODEL_NAME)
+        return _plain_model
+
+def _content_role(content):
+    return content.get("role") if isinstance(content, dict) else getattr(content, "role", None)
+
+def _content_text(content):
+    parts = content.get("parts", []) if isinstance(content, dict) else getattr(content, "parts", None) or []
+    return " ".join(part if isinstance(part, str) else getattr(part, "text", "") or "" for part in parts)
+
+def estimate_tokens(history):
+    """Rough token count of chat history (about 4 characters per token)"""
+    return sum(len(_content_text(content)) for content in history) // 4
+
+def _summary_turns(summary):
+    return [
+        {"role": "user", "parts": [f"(Summary of our conversation so far: {summary})"]},
+        {"role": "model", "parts": ["Got it."]}
+    ]
+
+def _summarize(previous_summary, turns):
+    """Fold older turns into the running summary (runs in a background thread)"""
+    # Background work never queues behind user traffic; it retries on a later turn
+    permit = llm_limiter.try_acquire()
+    if not permit:
+        logger.debug("LLM busy, postponing conversation summary")
+        return None
+    try:
+        lines = [f"{'User' if _content_role(content) == 'user' else 'Jessie'}: {_content_text(content)}"
+                 for content in turns]
+        previous = f"Summary so far: {previous_summary}\n\n" if previous_summary else ""
+        prompt = SUMMARY_PROMPT.format(words=SUMMARY_MAX_WORDS, previous=previous, turns="\n".join(lines))
+        with metrics.timed("llm_summary"):
+            return get_plain_model().generate_content(prompt).text.strip()
+    except Exception as e:
+        logger.error(f"Error summarizing conversation: {e}")
+        metrics.upstream_errors.inc("llm")
+        return None
+    finally:
+        permit.release()
+
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summarize")
+
+class ConversationContext:
+    """Keeps one chat's history within the token budget.
+
+    Both methods run with the session held (ChatSessionStore.use), so a
+    finished summary is swapped in between turns, never during one.
+    """
+
+    def __init__(self):
+        self.summary = ""
+        self._pending = None  # Future of the new summary, and how many history entries it covers
+
+    def prepare(self, chat):
+        """Apply a finished summary and enforce the hard limit before a turn is sent"""
+        history = list(chat.history)
+        if self._pending and self._pending[0].done():
+            future, covered = self._pending
+            self._pending = None
+            summary = future.result()
+            if summary:
+                self.summary = summary
+                history = _summary_turns(summary) + history[covered:]
+                chat.history = history
+                logger.debug(f"Compacted chat history to {estimate_tokens(history)} tokens")
+
+        tokens = estimate_tokens(history)
+        if tokens > CONTEXT_HARD_LIMIT_TOKENS and not self._pending:
+            # Summaries can't keep up (LLM busy or failing); drop the oldest turns instead
+            head = 2 if self.summary else 0
+            history = history[:head] + history[head:][-2 * CONTEXT_KEEP_TURNS:]
+            chat.history = history
+            tokens = estimate_tokens(history)
+        context_tokens.observe(tokens)
+
+    def after_turn(self, chat):
+        """Start summarizing older turns in the background once the budget is crossed"""
+        history = list(chat.history)
+        if self._pending or estimate_tokens(history) <= CONTEXT_TOKEN_BUDGET:
+            return
+        head = 2 if self.summary else 0
+        covered = len(history) - 2 * CONTEXT_KEEP_TURNS
+        if covered <= head:
+            return
+        future = _summary_executor.submit(_summarize, self.summary, history[head:covered])
+        self._pending = (future, covered)
+
+_contexts = weakref.WeakKeyDictionary()
+_contexts_lock = threading.Lock()
+
+def context_for(chat):
+    with _contexts_lock:
+        context = _contexts.get(chat)
+        if context is None:
+            context = _contexts[chat] = ConversationContext()
+        return context
+
 def start_conversation():
     """Start a new conversation with the AI"""
     try:
@@ -62,11 +199,8 @@ def start_conversation():
             logger.warning("No API key found, using fallback mode")
             return "FALLBACK_MODE"
         
-        # Start a new chat session
-        chat = model.start_chat(history=[])
-        # Set the system prompt
-        chat.send_message(SYSTEM_PROMPT)
-        return chat
+        # Start a new chat session; no request is made until the first message
+        return get_model().start_chat(history=[])
     except Exception as e:
         logger.error(f"Error starting conversation: {e}")
         return "FALLBACK_MODE"
@@ -77,10 +211,71 @@ def get_response(chat, message):
         if chat == "FALLBACK_MODE":
             return random.choice(FALLBACK_RESPONSES)
         
-        response = chat.send_message(message)
-        return response.text
+        context = context_for(chat)
+        context.prepare(chat)
+        with metrics.timed("llm"):
+            response = chat.send_message(message)
+            text = response.text
+        context.after_turn(chat)
+        return text
     except Exception as e:
         logger.error(f"Error getting response: {e}")
+        metrics.upstream_errors.inc("llm")
         return random.choice(FALLBACK_RESPONSES)
 
+def drop_unfinished_turn(chat):
+    """Forget the last turn if its streamed reply didn't finish cleanly.
+
+    google-generativeai keeps a streamed reply pending until chat.history is
+    read; if the stream was abandoned, failed or stopped early (e.g. SAFETY),
+    that read raises on every later turn unless the pair is removed.
+    """
+    try:
+        chat.history
+        return
+    except Exception as e:
+        logger.warning(f"Dropping unfinished chat turn: {e!r}")
+    try:
+        chat.rewind()
+    except Exception:
+        # rewind() reads the pending response too, which fails if it was never fully iterated
+        chat._last_sent = None
+        chat._last_received = None
+
+def get_response_stream(chat, message):
+    """Yield the AI's reply in chunks as Gemini generates them"""
+    received = False
+    start = time.perf_counter()
+    try:
+        if chat == "FALLBACK_MODE":
+            yield random.choice(FALLBACK_RESPONSES)
+            return
+        
+        context = context_for(chat)
+        context.prepare(chat)
+        try:
+            for chunk in chat.send_message(message, stream=True):
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. safety metadata) raise on .text
+                    continue
+                if text:
+                    if not received:
+                        metrics.record("llm_first_chunk", time.perf_counter() - start)
+                    received = True
+                    yield text
+        finally:
+            # Also runs when the client goes away mid-reply (GeneratorExit at the yield)
+            drop_unfinished_turn(chat)
+        metrics.record("llm", time.perf_counter() - start)
+        context.after_turn(chat)
+        if not received:
+            yield random.choice(FALLBACK_RESPONSES)
+    except Exception as e:
+        logger.error(f"Error streaming response: {e}")
+        metrics.upstream_errors.inc("llm")
+        if not received:
+            yield random.choice(FALLBACK_RESPONSES)
+
 # ... rest of the file remains unchanged ...
\ No newline at end of file
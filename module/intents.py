@@ -0,0 +1,251 @@
+# module/intents.py
+"""Answers commands and stock phrases locally, before a message reaches the LLM.
+
+Rules are exact phrases, prefixes or regular expressions over normalized text
+(lowercase, no punctuation, single spaces) and are compiled once into a dict,
+a prefix list and one combined regex. A handler returns a reply dict, or None
+to let the message fall through to the next rule and finally to Gemini.
+Replies with 'speak': True should be voiced like a chat reply.
+"""
+import os
+import re
+import random
+import logging
+import datetime
+import zoneinfo
+
+from module import metrics
+from module.store import shared_store
+from module.voice import SASSY_PHRASES
+from module.youtube import search_youtube, search_random_music
+from module.music import GENRES, MUSIC_LINES, find_genre, recommend_sync, recommendations
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+routed_messages = metrics.Counter("jessie_intent_routes_total",
+                                  "Messages by what answered them: an intent, or llm", "route")
+
+# Last thing said to each session, for "repeat"; shared by all workers
+LAST_REPLY_NAMESPACE = "last_reply"
+LAST_REPLY_TTL = 3600
+
+# Timezone for "what time is it" when the client doesn't send one; with neither,
+# the question goes to Gemini rather than answering with the server's clock
+DEFAULT_TIMEZONE = os.environ.get("DEFAULT_TIMEZONE")
+# Widest real UTC offsets, in minutes
+MAX_UTC_OFFSET = 14 * 60
+
+_PUNCTUATION = re.compile(r"[^\w\s']+")
+_SPACES = re.compile(r"\s+")
+
+def normalize(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return _SPACES.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
+
+class Intent:
+    """A named rule: handler(message, match) answers messages matching any of its phrases"""
+
+    def __init__(self, name, handler, exact=(), prefixes=(), patterns=()):
+        self.name = name
+        self.handler = handler
+        self.exact = exact
+        self.prefixes = prefixes
+        self.patterns = patterns
+
+class Match:
+    """What matched: the normalized text, the text after a prefix, and any named regex groups"""
+
+    def __init__(self, text, rest="", groups=None, session_id=None, timezone=None):
+        self.text = text
+        self.rest = rest
+        self.groups = groups or {}
+        self.session_id = session_id
+        self.timezone = timezone
+
+class IntentRouter:
+    def __init__(self, intents=()):
+        self.intents = list(intents)
+        self._compile()
+
+    def add(self, intent):
+        self.intents.append(intent)
+        self._compile()
+
+    def _compile(self):
+        self._exact = {}
+        self._prefixes = []
+        patterns = []
+        for index, intent in enumerate(self.intents):
+            for phrase in intent.exact:
+                self._exact.setdefault(normalize(phrase), intent)
+            for prefix in intent.prefixes:
+                self._prefixes.append((normalize(prefix) + " ", intent))
+            for pattern in intent.patterns:
+                patterns.append(f"(?P<_{index}_{len(patterns)}>{pattern})")
+        # Longest prefix first, so "play music by" can win over "play"
+        self._prefixes.sort(key=lambda item: len(item[0]), reverse=True)
+        self._pattern = re.compile("|".join(patterns)) if patterns else None
+
+    def _candidates(self, text):
+        intent = self._exact.get(text)
+        if intent:
+            yield intent, Match(text)
+        for prefix, intent in self._prefixes:
+            if text.startswith(prefix):
+                yield intent, Match(text, rest=text[len(prefix):])
+        if self._pattern:
+            found = self._pattern.fullmatch(text)
+            if found:
+                intent = self.intents[int(found.lastgroup.split("_")[1])]
+                groups = {name: value for name, value in found.groupdict().items()
+                          if value is not None and not name.startswith("_")}
+                yield intent, Match(text, groups=groups)
+
+    def route(self, message, session_id=None, timezone=None):
+        """Return (intent name, reply) for a message the router can answer, else (None, None).
+
+        timezone is the client's tzinfo (see resolve_timezone), or None if unknown.
+        """
+        text = normalize(message)
+        for intent, match in self._candidates(text):
+            match.session_id = session_id
+            match.timezone = timezone
+            reply = intent.handler(message, match)
+            if reply is not None:
+                routed_messages.inc(intent.name)
+                logger.debug(f"Intent {intent.name} answered {text!r}")
+                return intent.name, reply
+        routed_messages.inc("llm")
+        return None, None
+
+def _zone(name):
+    if isinstance(name, str) and name:
+        try:
+            return zoneinfo.ZoneInfo(name)
+        except Exception:
+            logger.debug(f"Unknown timezone {name!r}")
+    return None
+
+def resolve_timezone(name=None, utc_offset=None):
+    """tzinfo from the client's IANA zone name or UTC offset in minutes, else DEFAULT_TIMEZONE, else None"""
+    zone = _zone(name)
+    if zone:
+        return zone
+    # A bare offset can't follow daylight saving changes, so a zone name wins
+    if isinstance(utc_offset, int) and not isinstance(utc_offset, bool) and abs(utc_offset) <= MAX_UTC_OFFSET:
+        return datetime.timezone(datetime.timedelta(minutes=utc_offset))
+    return _zone(DEFAULT_TIMEZONE)
+
+def remember_reply(session_id, text):
+    """Keep the latest reply to a session so "repeat" can say it again"""
+    if session_id and text:
+        try:
+            shared_store.set(LAST_REPLY_NAMESPACE, session_id, text, ttl=LAST_REPLY_TTL)
+        except Exception as e:
+            logger.error(f"Error saving last reply: {e}")
+
+def last_reply(session_id):
+    try:
+        return shared_store.get(LAST_REPLY_NAMESPACE, session_id) if session_id else None
+    except Exception as e:
+        logger.error(f"Error reading last reply: {e}")
+        return None
+
+def _youtube_reply(result, query=None):
+    if not result:
+        if query is None:
+            return {'response': "Sorry, I couldn't find any random music right now."}
+        return {'response': f"Sorry, I couldn't find '{query}' on YouTube."}
+    title = result.get('title', query or 'Unknown')
+    channel = result.get('channel', '')
+    return {
+        'response': f"Playing {title}{' by ' + channel if channel else ''} from YouTube!",
+        'youtube_url': result['url'],
+        'youtube_metadata': result
+    }
+
+def play_random_music(message, match):
+    # Select a random music query (warmed in the background)
+    return _youtube_reply(search_random_music())
+
+def play_song(message, match):
+    # Search with the user's own wording, not the normalized text
+    stripped = message.strip()
+    song_query = stripped[5:].strip() if stripped.lower().startswith("play ") else match.rest
+    if not song_query:
+        return None
+    return _youtube_reply(search_youtube(song_query), song_query)
+
+# "recommend ..." is only about music if it says so or names a genre
+_MUSIC_WORDS = re.compile(r"\b(?:songs?|music|tracks?|tunes?)\b")
+
+def recommend_song(message, match):
+    genre = find_genre(match.rest)
+    if genre is None and not _MUSIC_WORDS.search(match.rest):
+        return None
+    # With no genre named, take one that already has songs queued
+    song = recommend_sync(genre or random.choice(recommendations.ready_genres() or GENRES))
+    if not song:
+        return {'response': MUSIC_LINES["no_recommendation"], 'speak': True}
+    reply = _youtube_reply(search_youtube(song), song)
+    if 'youtube_url' in reply:
+        reply['response'] = f"Ugh, fine. Here's something better than your taste: {song}. {reply['response']}"
+    return reply
+
+def canned_reply(message, match):
+    phrase = _CANNED_ALIASES.get(match.text, match.text)
+    return {'response': SASSY_PHRASES[phrase], 'speak': True}
+
+def tell_time(message, match):
+    # The server's clock is in its own timezone (UTC on Render), not the user's
+    if match.timezone is None:
+        return None
+    now = datetime.datetime.now(match.timezone)
+    return {'response': random.choice(TIME_REPLIES).format(time=now.strftime("%I:%M %p").lstrip("0")),
+            'speak': True}
+
+def repeat_last(message, match):
+    text = last_reply(match.session_id)
+    if not text:
+        return {'response': NOTHING_TO_REPEAT, 'speak': True}
+    return {'response': text, 'speak': True}
+
+def stop_talking(message, match):
+    # The browser stops audio and any video; nothing is spoken
+    return {'response': "Fine, shutting up.", 'stop': True}
+
+_CANNED_ALIASES = {
+    "hi": "hello",
+    "hey": "hello",
+    "hello jessie": "hello",
+    "hi jessie": "hello",
+    "hey jessie": "hello",
+    "thanks": "thank you",
+    "thank you jessie": "thank you",
+    "bye": "goodbye",
+    "bye jessie": "goodbye",
+    "i love you": "love you",
+}
+
+NOTHING_TO_REPEAT = "I haven't said anything yet, pagal."
+
+TIME_REPLIES = [
+    "It's {time}. Buy a watch, yaar.",
+    "{time}. Can't you read a clock?",
+    "It's {time}, duh.",
+]
+
+intent_router = IntentRouter([
+    Intent("stop", stop_talking,
+           exact=("stop", "stop it", "shut up", "be quiet", "quiet", "pause", "stop music", "stop talking")),
+    Intent("music_random", play_random_music, exact=("play music", "play some music", "play a song")),
+    Intent("music", play_song, prefixes=("play",)),
+    Intent("recommend", recommend_song, prefixes=("recommend", "recommend me", "suggest", "suggest me")),
+    Intent("repeat", repeat_last,
+           exact=("repeat", "repeat that", "say that again", "say it again", "what did you say", "come again")),
+    Intent("time", tell_time,
+           patterns=(r"(?:what(?:'s| is) the )?time(?: is it)?(?: now)?", r"what time is it(?: now)?")),
+    Intent("canned", canned_reply, exact=tuple(SASSY_PHRASES) + tuple(_CANNED_ALIASES)),
+])
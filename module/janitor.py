@@ -0,0 +1,122 @@
+# module/janitor.py
+import os
+import time
+import logging
+import threading
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class AudioJanitor:
+    """Keeps a directory of generated audio bounded by age and total size.
+
+    Files are indexed as they are written, in a SharedStore namespace ordered by
+    mtime with a running byte total, so sweeps only touch the files they delete
+    instead of listing and stat-ing the whole directory. Every worker shares the
+    index, and a file is deleted only by the worker that claims its entry.
+    """
+
+    def __init__(self, directory, store, namespace="audio", max_age=300, max_bytes=50 * 1024 * 1024,
+                 interval=60, extension=".mp3"):
+        self.directory = directory
+        self.store = store
+        self.namespace = namespace
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.extension = extension
+        self._seeded = False
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def track(self, path, size=None, mtime=None):
+        """Record a file that was just written (or re-used) in the index"""
+        try:
+            if size is None or mtime is None:
+                stat = os.stat(path)
+                size = stat.st_size if size is None else size
+                mtime = stat.st_mtime if mtime is None else mtime
+        except FileNotFoundError:
+            return
+        try:
+            self.store.set(self.namespace, os.path.basename(path), size=size, timestamp=mtime)
+        except Exception as e:
+            logger.error(f"Error indexing audio file {os.path.basename(path)}: {e}")
+
+    def _seed(self):
+        """Index files left over from earlier runs; the only full directory scan"""
+        with self._lock:
+            if self._seeded:
+                return
+            self._seeded = True
+        try:
+            if self.store.totals(self.namespace)[0]:
+                return
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith(self.extension):
+                    stat = entry.stat()
+                    self.track(entry.path, stat.st_size, stat.st_mtime)
+            files, total_bytes = self.store.totals(self.namespace)
+            logger.info(f"Audio janitor indexed {files} files ({total_bytes} bytes)")
+        except FileNotFoundError:
+            logger.warning(f"Audio directory does not exist: {self.directory}")
+        except Exception as e:
+            logger.error(f"Error indexing audio directory: {e}")
+
+    def sweep(self):
+        """Delete files past max_age, then the oldest files while over max_bytes"""
+        self._seed()
+        files_deleted = 0
+        cutoff = time.time() - self.max_age
+        total_bytes = self.store.totals(self.namespace)[1]
+        # Once over the size limit, keep deleting until under 80% of it
+        size_limit = self.max_bytes * 0.8 if total_bytes > self.max_bytes else self.max_bytes
+        while True:
+            oldest = self.store.oldest(self.namespace, 64)
+            if not oldest:
+                break
+            for name, size, mtime in oldest:
+                if mtime > cutoff and total_bytes <= size_limit:
+                    break
+                # Another worker's sweep may have claimed it first
+                if self.store.delete(self.namespace, name):
+                    total_bytes -= size
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                        files_deleted += 1
+                        logger.debug(f"Cleaned up old audio file: {name}")
+                    except FileNotFoundError:
+                        pass
+                    except Exception as e:
+                        logger.error(f"Error cleaning up file {name}: {e}")
+            else:
+                total_bytes = self.store.totals(self.namespace)[1]
+                continue
+            break
+        if files_deleted:
+            logger.info(f"Cleanup completed. Deleted {files_deleted} files.")
+        return files_deleted
+
+    def _run(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Error in audio janitor: {e}")
+            time.sleep(self.interval)
+
+    def start(self):
+        """Sweep on a schedule in a background thread (once per process)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audio-janitor", daemon=True)
+                self._thread.start()
+
+    def stats(self):
+        files, total_bytes = self.store.totals(self.namespace)
+        return {
+            'files': files,
+            'bytes': total_bytes,
+            'max_bytes': self.max_bytes
+        }
@@ -0,0 +1,150 @@
+# module/metrics.py
+"""Lightweight in-process metrics with Prometheus text output.
+
+Histograms and counters are per worker process. Stage timings recorded with
+timed() inside a request are also collected for that request's Server-Timing
+header (see start_request / server_timing_header).
+"""
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+def _format_labels(label_name, label_value, extra=""):
+    labels = f'{label_name}="{label_value}"' if label_name else ""
+    if extra:
+        labels = f"{labels},{extra}" if labels else extra
+    return f"{{{labels}}}" if labels else ""
+
+class Histogram:
+    def __init__(self, name, help_text, label_name=None, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_name = label_name
+        self.buckets = tuple(buckets)
+        self._values = {}  # label value -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, label=""):
+        with self._lock:
+            values = self._values.get(label)
+            if values is None:
+                values = self._values[label] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    values[index] += 1
+                    break
+            values[-2] += value
+            values[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((label, list(values)) for label, values in self._values.items())
+        for label, values in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                bucket_labels = _format_labels(self.label_name, label, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            bucket_labels = _format_labels(self.label_name, label, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {values[-1]}")
+            labels = _format_labels(self.label_name, label)
+            lines.append(f"{self.name}_sum{labels} {values[-2]}")
+            lines.append(f"{self.name}_count{labels} {values[-1]}")
+        return lines
+
+class Counter:
+    def __init__(self, name, help_text, label_name=None):
+        self.name = name
+        self.help_text = help_text
+        self.label_name = label_name
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, label="", amount=1):
+        with self._lock:
+            self._values[label] = self._values.get(label, 0) + amount
+
+    def value(self, label=""):
+        with self._lock:
+            return self._values.get(label, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(self.label_name, label)} {value}" for label, value in items)
+        return lines
+
+class Gauge:
+    """A value read from a callback at scrape time, e.g. a cache's current size"""
+
+    def __init__(self, name, help_text, callback):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+        _registry.append(self)
+
+    def render(self):
+        try:
+            value = self.callback()
+        except Exception as e:
+            logger.error(f"Error reading gauge {self.name}: {e}")
+            return []
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+stage_seconds = Histogram("jessie_stage_duration_seconds", "Time spent in each request stage", "stage")
+request_seconds = Histogram("jessie_request_duration_seconds", "Time to produce a response, by endpoint", "endpoint")
+cache_hits = Counter("jessie_cache_hits_total", "Cache lookups answered from the cache", "cache")
+cache_misses = Counter("jessie_cache_misses_total", "Cache lookups that went upstream", "cache")
+upstream_errors = Counter("jessie_upstream_errors_total", "Failed calls to upstream services", "upstream")
+rejected_calls = Counter("jessie_rejected_calls_total", "Calls turned away because an upstream was at capacity", "upstream")
+coalesced_calls = Counter("jessie_coalesced_calls_total", "Calls that joined an identical call already in flight", "operation")
+
+# Stage timings for the current request, for the Server-Timing header
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+def start_request():
+    _request_timings.set([])
+
+def record(stage, seconds):
+    stage_seconds.observe(seconds, stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+@contextmanager
+def timed(stage):
+    """Time a block as one stage of the current request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+def record_cache(cache, hit):
+    (cache_hits if hit else cache_misses).inc(cache)
+
+def server_timing_header():
+    """Server-Timing value for stages recorded so far in this request"""
+    timings = _request_timings.get() or []
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings)
+
+def render():
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -1,37 +1,52 @@
-import pywhatkit as kit
-from module.chat import start_conversation
+from module.chat import get_plain_model, api_key
+import os
 import asyncio
 from module.voice import speak
+from module import runtime, metrics
+from module.store import shared_store, normalize_key
+from module.singleflight import SingleFlight
+from module.admission import llm_limiter, Overloaded
+import json
 import logging
 import re
 import random
+import threading
+from collections import deque
 from datetime import datetime, timedelta
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Song recommendation history
-RECOMMENDATION_HISTORY = []
+# Song recommendation history, shared by all workers through the state store
+HISTORY_NAMESPACE = "recommended_songs"
+BLACKLIST_NAMESPACE = "song_blacklist"
 MAX_HISTORY_SIZE = 20  # Increased history size
 HISTORY_EXPIRY_HOURS = 24
 
-# Blacklist for songs that keep repeating
+# Recommendations can retry several LLM calls, so allow longer than a single TTS job
+MUSIC_TIMEOUT = 120
+
+# Each LLM call asks for a batch of candidates, which are filtered locally and queued
+# per genre; a background refill starts once a queue drops below QUEUE_LOW_WATER
+CANDIDATES_PER_CALL = 8
+QUEUE_LOW_WATER = 2
+MAX_REFILL_CALLS = 3
+# Genre queues filled at startup, so a request that names no genre is served from memory
+PREFETCH_GENRES = int(os.environ.get("MUSIC_PREFETCH_GENRES", 4))
+
+# Blacklist for songs that keep repeating; copied into the store on first use
 SONG_BLACKLIST = {
     "Tujamo - Down": datetime.now() - timedelta(days=30)  # Blacklist for 30 days
 }
 
-# More diverse prompts
-RECOMMENDATION_PROMPTS = [
-    "Recommend a {decade} {genre} song that's not too mainstream. Reply ONLY with song name. Add sarcastic comment.",
-    "What's an underrated {genre} song from {decade}? Reply ONLY with song name. Add sarcastic comment.",
-    "Give me a {genre} song recommendation that most people haven't heard. Reply ONLY with song name. Add sarcastic comment.",
-    "I need a {genre} song that's not on the radio. Reply ONLY with song name. Add sarcastic comment.",
-    "Play some {genre} music that's actually good. Reply ONLY with song name. Add sarcastic comment.",
-    "Recommend a {genre} song that's not overplayed. Reply ONLY with song name. Add sarcastic comment.",
-    "What's a hidden gem in {genre} music? Reply ONLY with song name. Add sarcastic comment.",
-    "Give me a {genre} song that deserves more attention. Reply ONLY with song name. Add sarcastic comment."
-]
+# One structured prompt returns a batch of candidates
+RECOMMENDATION_PROMPT = (
+    "Recommend {count} different {genre} songs that aren't too mainstream, mixing decades "
+    "(for example {decades}). Don't include any of these: {exclude}. "
+    'Reply ONLY with a JSON array of objects with keys "song", "artist" and "comment", '
+    "where comment is one short sarcastic line."
+)
 
 # Expanded genres with subgenres
 GENRES = [
@@ -55,69 +70,236 @@ DECADES = [
 
 def clean_recommendation_history():
     """Remove old recommendations from history"""
-    global RECOMMENDATION_HISTORY
+    shared_store.purge_expired()
+
+def blacklist_song(song, days=30):
+    """Stop recommending a song for a number of days; candidates whose full "Title - Artist"
+    name, title or artist equals the entry are skipped"""
+    shared_store.set(BLACKLIST_NAMESPACE, normalize_key(song), value=song, ttl=days * 24 * 3600)
+
+_blacklist_seeded = False
+
+def _seed_blacklist():
+    global _blacklist_seeded
+    if _blacklist_seeded:
+        return
+    _blacklist_seeded = True
     now = datetime.now()
-    RECOMMENDATION_HISTORY = [
-        rec for rec in RECOMMENDATION_HISTORY
-        if now - rec['timestamp'] < timedelta(hours=HISTORY_EXPIRY_HOURS)
-    ]
+    for song, expiry in SONG_BLACKLIST.items():
+        if expiry > now:
+            shared_store.set(BLACKLIST_NAMESPACE, normalize_key(song), value=song,
+                             ttl=(expiry - now).total_seconds())
+
+def _song_keys(song):
+    """The full normalized name plus its title and artist parts"""
+    key = normalize_key(song)
+    return [key] + [part.strip() for part in key.split(" - ") if part.strip() and part.strip() != key]
 
 def is_blacklisted(song):
     """Check if a song is blacklisted"""
-    for blacklisted_song, expiry in SONG_BLACKLIST.items():
-        if blacklisted_song.lower() in song.lower():
-            if datetime.now() < expiry:
-                return True
-    return False
+    _seed_blacklist()
+    return any(shared_store.contains(BLACKLIST_NAMESPACE, key) for key in _song_keys(song))
 
 def is_recently_recommended(song):
     """Check if a song was recently recommended"""
-    clean_recommendation_history()
-    return any(rec['song'].lower() == song.lower() for rec in RECOMMENDATION_HISTORY)
+    return shared_store.contains(HISTORY_NAMESPACE, normalize_key(song))
+
+def recent_recommendations(limit=MAX_HISTORY_SIZE):
+    """Recently recommended songs, newest first"""
+    return shared_store.recent(HISTORY_NAMESPACE, limit)
 
 def add_to_recommendation_history(song):
     """Add a song to the recommendation history"""
-    global RECOMMENDATION_HISTORY
-    RECOMMENDATION_HISTORY.append({
-        'song': song,
-        'timestamp': datetime.now()
-    })
-    if len(RECOMMENDATION_HISTORY) > MAX_HISTORY_SIZE:
-        RECOMMENDATION_HISTORY.pop(0)
-
-async def get_recommended_songs(max_attempts=5):  # Increased max attempts
+    shared_store.set(HISTORY_NAMESPACE, normalize_key(song), value=song, ttl=HISTORY_EXPIRY_HOURS * 3600)
+    shared_store.trim(HISTORY_NAMESPACE, MAX_HISTORY_SIZE)
+
+def parse_candidates(text):
+    """Parse a batch reply into song names, accepting JSON or one song per line"""
+    text = text.strip()
+    # Models sometimes wrap JSON in a markdown code fence
+    text = re.sub(r'^```(?:json)?\s*|\s*```$', '', text)
+    try:
+        items = json.loads(text)
+        songs = []
+        for item in items if isinstance(items, list) else []:
+            if isinstance(item, dict) and item.get('song'):
+                artist = str(item.get('artist') or '').strip()
+                songs.append(f"{item['song'].strip()} - {artist}" if artist else item['song'].strip())
+            elif isinstance(item, str) and item.strip():
+                songs.append(item.strip())
+        return songs
+    except ValueError:
+        pass
+    songs = []
+    for line in text.splitlines():
+        # Drop list markers, then keep just the song name before any sarcastic comment
+        line = re.sub(r'^\s*(?:[-*\u2022]|\d+[.)])\s*', '', line).strip()
+        match = re.match(r'^(.*?)(?:[.!?]|$)', line)
+        song = (match.group(1) if match else line).strip(' "')
+        if song:
+            songs.append(song)
+    return songs
+
+class RecommendationQueue:
+    """Ready-to-play recommendations per genre, topped up in the background"""
+
+    def __init__(self, candidates_per_call=CANDIDATES_PER_CALL, low_water=QUEUE_LOW_WATER):
+        self.candidates_per_call = candidates_per_call
+        self.low_water = low_water
+        self._queues = {}        # genre -> deque of songs
+        self._refills = SingleFlight("recommendations")  # one refill per genre at a time
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fresh(song):
+        """Not blacklisted or recently recommended (blocking: reads the shared store)"""
+        return not is_blacklisted(song) and not is_recently_recommended(song)
+
+    async def _fetch(self, genre):
+        """Ask for one batch of candidates and queue the ones that pass the filters"""
+        with self._lock:
+            queued = [song.lower() for song in self._queues.get(genre, ())]
+        # Store reads and writes can wait on SQLite locks, so they stay off the event loop
+        recent = await asyncio.to_thread(recent_recommendations)
+        prompt = RECOMMENDATION_PROMPT.format(
+            count=self.candidates_per_call, genre=genre,
+            decades=", ".join(random.sample(DECADES, 3)),
+            exclude="; ".join(recent + queued) or "nothing"
+        )
+        # Gemini calls block, so keep them off the shared event loop
+        with metrics.timed("llm_recommend"):
+            response = await asyncio.to_thread(self._generate, prompt)
+        candidates = parse_candidates(response.text)
+        fresh = await asyncio.to_thread(lambda: [song for song in candidates if self._fresh(song)])
+        added = 0
+        with self._lock:
+            queue = self._queues.setdefault(genre, deque())
+            queued = {song.lower() for song in queue}
+            for song in fresh:
+                if song.lower() not in queued:
+                    queue.append(song)
+                    queued.add(song.lower())
+                    added += 1
+        logger.info(f"Queued {added} {genre} recommendations")
+        return added
+
+    @staticmethod
+    def _generate(prompt):
+        # Background refills share the LLM limit with chat requests
+        with llm_limiter.slot():
+            # Not the chat model: its persona asks for short Hinglish replies, not JSON
+            return get_plain_model().generate_content(
+                prompt, generation_config={"response_mime_type": "application/json"})
+
+    async def refill(self, genre, max_calls=MAX_REFILL_CALLS):
+        """Fetch batches until the genre's queue is above the low-water mark"""
+        for attempt in range(max_calls):
+            with self._lock:
+                if len(self._queues.get(genre, ())) > self.low_water:
+                    return
+            try:
+                await self._fetch(genre)
+            except Overloaded:
+                logger.warning(f"LLM at capacity, skipping {genre} recommendation refill")
+                return
+            except Exception as e:
+                logger.error(f"Error getting {genre} recommendations (attempt {attempt + 1}): {e}")
+                metrics.upstream_errors.inc("llm")
+
+    async def _shared_refill(self, genre):
+        """Run refill(genre), joining the one already in flight for the genre if there is one"""
+        return await self._refills.do_async(genre, lambda: self.refill(genre))
+
+    def _schedule_refill(self, genre):
+        """Top up the genre's queue in the background"""
+        return runtime.submit(self._shared_refill(genre))
+
+    async def _pop(self, genre):
+        while True:
+            with self._lock:
+                queue = self._queues.get(genre)
+                if not queue:
+                    return None, 0
+                song = queue.popleft()
+                remaining = len(queue)
+            # History may have changed since the song was queued
+            if await asyncio.to_thread(self._fresh, song):
+                return song, remaining
+
+    async def next(self, genre):
+        """Return the next recommendation for the genre, waiting on the LLM only if the queue is empty"""
+        song, remaining = await self._pop(genre)
+        metrics.record_cache("recommendations", song is not None)
+        if song is None:
+            await self._shared_refill(genre)
+            song, remaining = await self._pop(genre)
+        if remaining <= self.low_water:
+            self._schedule_refill(genre)
+        if song:
+            await asyncio.to_thread(add_to_recommendation_history, song)
+        return song
+
+    def prefetch(self, genres):
+        """Fill the queues for the given genres in the background"""
+        for genre in genres:
+            self._schedule_refill(genre)
+
+    def ready_genres(self):
+        """Genres with recommendations queued right now"""
+        with self._lock:
+            return [genre for genre, queue in self._queues.items() if queue]
+
+    def stats(self):
+        with self._lock:
+            return {genre: len(queue) for genre, queue in self._queues.items()}
+
+recommendations = RecommendationQueue()
+
+def start_prefetch():
+    """Fill PREFETCH_GENRES random genre queues in the background"""
+    if not api_key or PREFETCH_GENRES <= 0:
+        return
+    recommendations.prefetch(random.sample(GENRES, min(PREFETCH_GENRES, len(GENRES))))
+
+# Fixed lines, pre-rendered into the phrase bundle
+MUSIC_LINES = {
+    "no_recommendation": "Music recs are so basic anyway",
+    "no_song": "Fuck, you didn't tell me what to play!",
+    "bad_song": "Fuck, that's not a real song name!",
+    "error": "Fuck, this is so bakwas. Try again?"
+}
+
+def find_genre(text):
+    """Return the longest genre named in the text, or None"""
+    text = (text or "").lower()
+    matches = [genre for genre in GENRES if re.search(rf'\b{re.escape(genre.lower())}\b', text)]
+    return max(matches, key=len) if matches else None
+
+def recommend_sync(genre):
+    """Blocking recommendations.next(genre), for request threads; None if nothing is available"""
+    try:
+        return runtime.run(recommendations.next(genre), timeout=MUSIC_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Error getting {genre} recommendation: {e}")
+        return None
+
+async def get_recommended_songs(genre=None):
     """Get song with attitude and variety"""
-    for attempt in range(max_attempts):
-        try:
-            # Select random genre, decade, and prompt
-            genre = random.choice(GENRES)
-            decade = random.choice(DECADES)
-            prompt_template = random.choice(RECOMMENDATION_PROMPTS)
-            prompt = prompt_template.format(genre=genre, decade=decade)
-            
-            chat = start_conversation()
-            response = chat.send_message(prompt)
-            song_text = response.text.strip()
-            
-            # Extract just the song name before any sarcastic comments
-            match = re.match(r'^(.*?)(?:[.!?]|$)', song_text)
-            song = match.group(1).strip() if match else song_text
-            
-            # Check if this song is blacklisted or recently recommended
-            if not is_blacklisted(song) and not is_recently_recommended(song):
-                add_to_recommendation_history(song)
-                return song
-            
-            logger.info(f"Song '{song}' was recently recommended or blacklisted, trying again...")
-            
-        except Exception as e:
-            logger.error(f"Error getting song recommendation (attempt {attempt + 1}): {e}")
-            if attempt == max_attempts - 1:
-                await speak("Music recs are so basic anyway")
-                return None
-            await asyncio.sleep(1)  # Wait before retrying
-    
-    return None
+    genre = genre or random.choice(GENRES)
+    try:
+        song = await recommendations.next(genre)
+    except Exception as e:
+        logger.error(f"Error getting song recommendation: {e}")
+        song = None
+    if not song:
+        await speak(MUSIC_LINES["no_recommendation"])
+    return song
+
+def play_on_youtube(song):
+    """Open the song on YouTube in the local browser"""
+    # pywhatkit is slow to import and only needed for local playback
+    import pywhatkit as kit
+    kit.playonyt(song)
 
 async def play_music(song_name=None):
     """Play music with attitude"""
@@ -125,11 +307,11 @@ async def play_music(song_name=None):
         logger.info(f"Received music request: {song_name}")
         
         if song_name is None or "recommend" in song_name.lower():
-            song = await get_recommended_songs()
+            song = await get_recommended_songs(find_genre(song_name))
             if song:
                 logger.info(f"Playing recommended song: {song}")
                 await speak(f"Ugh, fine. Here's some basic music for you: {song}")
-                kit.playonyt(song)
+                play_on_youtube(song)
                 return song
             return None
         else:
@@ -144,34 +326,29 @@ async def play_music(song_name=None):
             
             if not song:
                 logger.warning("Empty song name after processing")
-                await speak("Fuck, you didn't tell me what to play!")
+                await speak(MUSIC_LINES["no_song"])
                 return None
                 
             # If the song name is too short, it might be invalid
             if len(song) < 2:
                 logger.warning(f"Song name too short: {song}")
-                await speak("Fuck, that's not a real song name!")
+                await speak(MUSIC_LINES["bad_song"])
                 return None
                 
             logger.info(f"Attempting to play song: {song}")
             await speak(f"Whatever... playing {song} for fuck's sake")
-            kit.playonyt(song)
+            play_on_youtube(song)
             return song
     except Exception as e:
         logger.error(f"Error playing music: {e}")
-        await speak("Fuck, this is so bakwas. Try again?")
+        await speak(MUSIC_LINES["error"])
         return None
 
 # Non-async wrapper for compatibility
 def play_music_sync(song_name=None):
     """Synchronous wrapper for play_music"""
     try:
-        # Create a new event loop if one doesn't exist
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(play_music(song_name))
-        loop.close()
-        return result
+        return runtime.run(play_music(song_name), timeout=MUSIC_TIMEOUT)
     except Exception as e:
         logger.error(f"Error in play_music_sync: {e}")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,255 @@
+# module/phrase_bundle.py
+"""Pre-rendered audio for the fixed lines Jessie says.
+
+Canned replies, LLM fallbacks and fixed music lines never change, so they are
+synthesized ahead of time in every voice and audio format into a versioned
+bundle directory with a manifest:
+
+    python -m module.phrase_bundle          # build if missing or stale
+    python -m module.phrase_bundle --force  # rebuild anyway
+
+The version is a digest of the phrase tables, voices, formats and clip
+settings, so editing a table yields a new version; the app then ignores the
+stale bundle and (with AUDIO_BUNDLE_AUTO_BUILD) rebuilds it in the background.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import hashlib
+import logging
+import argparse
+import threading
+
+from module import metrics
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BUNDLE_DIR = os.environ.get("AUDIO_BUNDLE_DIR", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "audio_bundle"))
+AUTO_BUILD = os.environ.get("AUDIO_BUNDLE_AUTO_BUILD", "True").lower() == "true"
+BUILD_CONCURRENCY = int(os.environ.get("AUDIO_BUNDLE_CONCURRENCY", 4))
+# Bump when the bundle layout or rendering changes in a way the tables don't show
+BUNDLE_LAYOUT = 1
+MANIFEST = "manifest.json"
+# A build lock older than this is assumed to belong to a dead process
+LOCK_STALE_SECONDS = 600
+# How often a worker without a current bundle looks for one built by another
+RELOAD_INTERVAL = 30
+
+def static_phrases():
+    """Every fixed line that is spoken as is, from the tables that define them"""
+    # Imported here: these modules import voice, which imports this one
+    from module.voice import SASSY_PHRASES
+    from module.chat import FALLBACK_RESPONSES, EMPTY_REPLY
+    from module.music import MUSIC_LINES
+    from module.intents import NOTHING_TO_REPEAT
+    phrases = list(SASSY_PHRASES.values()) + list(FALLBACK_RESPONSES) + list(MUSIC_LINES.values())
+    phrases += [NOTHING_TO_REPEAT, EMPTY_REPLY]
+    return sorted(set(phrases))
+
+def bundle_spec():
+    """Everything a bundle's contents depend on, and the version derived from it"""
+    from module.voice import VOICE_FALLBACKS, prepare_speech_text
+    from module.audio_format import available_formats
+    from module import audio_processing
+    texts = sorted({prepare_speech_text(phrase, emo=False) for phrase in static_phrases()})
+    spec = {
+        'layout': BUNDLE_LAYOUT,
+        'texts': texts,
+        'voices': list(VOICE_FALLBACKS),
+        'formats': sorted(available_formats()),
+        'postprocess': [audio_processing.TTS_POSTPROCESS, audio_processing.TTS_EDGE_MS,
+                        audio_processing.TTS_PAUSE_MS, audio_processing.TTS_TARGET_DBFS,
+                        audio_processing.TTS_BITRATE]
+    }
+    digest = hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return digest, spec
+
+class PhraseBundle:
+    """The current bundle's files, looked up by the TTS cache file name of each clip"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.version = None
+        self._files = set()
+        self._phrases = None
+        self._expected = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+        self._building = False
+
+    def phrases(self):
+        """Fixed lines as written in the tables, to skip the random attitude treatment"""
+        if self._phrases is None:
+            self._phrases = frozenset(static_phrases())
+        return self._phrases
+
+    def _version_dir(self, version):
+        return os.path.join(self.directory, version)
+
+    def load(self):
+        """Use the bundle matching the current phrase tables, if it has been built"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if self._expected is None:
+                self._expected = bundle_spec()[0]
+            try:
+                with open(os.path.join(self._version_dir(self._expected), MANIFEST)) as f:
+                    manifest = json.load(f)
+            except FileNotFoundError:
+                return False
+            except Exception as e:
+                logger.error(f"Error reading phrase bundle manifest: {e}")
+                return False
+            self._files = set(manifest['clips'])
+            self.version = manifest['version']
+            logger.info(f"Loaded phrase bundle {self.version} ({len(self._files)} clips)")
+            return True
+
+    def get(self, filename):
+        """Return the bundled clip with this file name, or None"""
+        if self.version is None:
+            if time.monotonic() - self._checked_at < RELOAD_INTERVAL or not self.load():
+                return None
+        if filename not in self._files:
+            return None
+        try:
+            with open(os.path.join(self._version_dir(self.version), filename), 'rb') as f:
+                content = f.read()
+        except Exception as e:
+            logger.error(f"Error reading bundled clip {filename}: {e}")
+            return None
+        metrics.record_cache("phrase_bundle", True)
+        return content
+
+    def start(self):
+        """Load the bundle in the background, rebuilding it there if the tables have changed.
+
+        Working out the current version probes for pydub and ffmpeg, so it stays off worker startup.
+        """
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(target=self._start_in_background, name="phrase-bundle", daemon=True).start()
+
+    def _start_in_background(self):
+        from module import runtime
+        try:
+            if self.load():
+                return
+            if not AUTO_BUILD:
+                logger.warning("No phrase bundle for the current phrase tables. Run: python -m module.phrase_bundle")
+                return
+            if runtime.submit(build(self.directory)).result():
+                self.load()
+        except Exception as e:
+            logger.error(f"Error building phrase bundle: {e}")
+        finally:
+            self._building = False
+
+    def stats(self):
+        return {'version': self.version, 'clips': len(self._files)}
+
+def _acquire_build_lock(directory):
+    """Create the build lock file, or return None if another live build holds it"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, ".build.lock")
+    try:
+        if time.time() - os.path.getmtime(path) > LOCK_STALE_SECONDS:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return path
+    except FileExistsError:
+        return None
+
+async def _render(text, voice):
+    """Synthesize one line in one specific voice, without failing over to another"""
+    from module.voice import _audio_chunks
+    from module.audio_processing import postprocess_clip
+    content = b"".join([chunk async for chunk in _audio_chunks(text, voice)])
+    if not content:
+        raise RuntimeError("no audio received")
+    return await asyncio.to_thread(postprocess_clip, content)
+
+async def build(directory=BUNDLE_DIR, force=False):
+    """Render every static phrase in every voice and format; True if a bundle was written"""
+    from module.voice import load_edge_tts, tts_cache
+    from module.audio_format import NATIVE_FORMAT, extension_for, transcode
+
+    version, spec = bundle_spec()
+    target = os.path.join(directory, version)
+    if os.path.exists(os.path.join(target, MANIFEST)) and not force:
+        logger.info(f"Phrase bundle {version} is up to date")
+        return True
+    if load_edge_tts() is None:
+        logger.error("edge_tts not available. Cannot build the phrase bundle.")
+        return False
+    lock = _acquire_build_lock(directory)
+    if lock is None:
+        logger.info("Another process is building the phrase bundle")
+        return False
+
+    staging = os.path.join(directory, f".{version}.{os.getpid()}.tmp")
+    try:
+        os.makedirs(staging, exist_ok=True)
+        semaphore = asyncio.Semaphore(BUILD_CONCURRENCY)
+        clips = {}
+        failed = []
+
+        async def render_all_formats(text, voice):
+            async with semaphore:
+                try:
+                    native = await _render(text, voice)
+                    for audio_format in spec['formats']:
+                        content = native if audio_format == NATIVE_FORMAT else \
+                            await asyncio.to_thread(transcode, native, audio_format)
+                        key = tts_cache.make_key(text, voice, audio_format)
+                        filename = tts_cache.filename_for(key, extension_for(audio_format))
+                        with open(os.path.join(staging, filename), 'wb') as f:
+                            f.write(content)
+                        clips[filename] = {'text': text, 'voice': voice, 'format': audio_format, 'bytes': len(content)}
+                except Exception as e:
+                    logger.error(f"Error rendering {voice} phrase {text!r}: {e}")
+                    failed.append((text, voice))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(render_all_formats(text, voice)
+                               for text in spec['texts'] for voice in spec['voices']))
+        # A partial bundle would count as current until the tables change, so write none
+        if failed:
+            logger.error(f"Phrase bundle {version} not written: {len(failed)} clips failed to render")
+            return False
+        manifest = {'version': version, 'created': time.time(), **spec, 'clips': clips}
+        with open(os.path.join(staging, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+
+        # Swap the finished bundle in whole, then drop older versions
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.replace(staging, target)
+        for entry in os.scandir(directory):
+            if entry.is_dir() and entry.name != version and not entry.name.startswith("."):
+                shutil.rmtree(entry.path, ignore_errors=True)
+        logger.info(f"Built phrase bundle {version}: {len(clips)} clips in {time.perf_counter() - started:.1f}s")
+        return True
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+        os.remove(lock)
+
+phrase_bundle = PhraseBundle(BUNDLE_DIR)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-render Jessie's fixed lines into the phrase bundle")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the bundle is up to date")
+    parser.add_argument("--dir", default=BUNDLE_DIR, help="bundle directory (default: %(default)s)")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(build(args.dir, force=args.force)) else 1)
@@ -0,0 +1,72 @@
+# module/runtime.py
+import os
+import asyncio
+import logging
+import threading
+import concurrent.futures
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default seconds a sync caller waits on a coroutine before giving up
+DEFAULT_TIMEOUT = float(os.environ.get("ASYNC_TIMEOUT_SECONDS", 30))
+
+# One event loop thread per worker process, started on first use
+_loop = None
+_thread = None
+_pid = None
+_lock = threading.Lock()
+
+def _run_loop(loop):
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+def get_loop():
+    """Return the shared background event loop, starting it if needed"""
+    global _loop, _thread, _pid
+    with _lock:
+        # A forked gunicorn worker inherits the loop object but not its thread
+        if _loop is None or _pid != os.getpid() or not _thread.is_alive():
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_run_loop, args=(_loop,), name="async-runtime", daemon=True)
+            _thread.start()
+            _pid = os.getpid()
+            logger.debug(f"Started async runtime thread in process {_pid}")
+        return _loop
+
+def in_runtime_thread():
+    return _thread is not None and threading.current_thread() is _thread
+
+def submit(coro):
+    """Schedule a coroutine on the shared loop and return a concurrent.futures.Future"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+def run(coro, timeout=DEFAULT_TIMEOUT):
+    """Run a coroutine on the shared loop and block until it finishes or times out"""
+    if in_runtime_thread():
+        coro.close()
+        raise RuntimeError("runtime.run() called from the runtime thread; await the coroutine instead")
+    future = submit(coro)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
+
+async def _anext(agen):
+    return await agen.__anext__()
+
+def iterate(agen, timeout=DEFAULT_TIMEOUT):
+    """Drive an async generator on the shared loop from synchronous code, item by item"""
+    try:
+        while True:
+            try:
+                yield run(_anext(agen), timeout)
+            except StopAsyncIteration:
+                break
+    finally:
+        try:
+            run(agen.aclose(), timeout)
+        except Exception as e:
+            logger.error(f"Error closing async generator: {e}")
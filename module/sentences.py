@@ -0,0 +1,51 @@
+# module/sentences.py
+import re
+import itertools
+
+# A sentence ends at . ! or ? (plus any closing quotes/brackets) followed by whitespace
+SENTENCE_END_RE = re.compile(r'[.!?]+["\'\)\]]*\s+')
+
+# Fragments shorter than this are merged into the next sentence so we don't
+# start a TTS job for "Ugh." on its own
+MIN_SENTENCE_CHARS = 20
+
+def split_sentences(text, min_chars=MIN_SENTENCE_CHARS):
+    """Split complete text into sentences"""
+    return list(iter_sentences([text], min_chars))
+
+def iter_sentences(chunks, min_chars=MIN_SENTENCE_CHARS):
+    """Yield sentences from streamed text chunks as soon as each one is complete"""
+    buffer = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buffer += chunk
+        start = 0
+        cut = 0
+        for match in SENTENCE_END_RE.finditer(buffer):
+            if match.end() - start >= min_chars:
+                cut = match.end()
+                yield buffer[start:cut].strip()
+                start = cut
+        buffer = buffer[cut:]
+    if buffer.strip():
+        yield buffer.strip()
+
+def iter_reply_sentences(chunks, whole_replies=(), min_chars=MIN_SENTENCE_CHARS):
+    """Like iter_sentences, but a reply that is exactly one of whole_replies is yielded unsplit.
+
+    Chunks are held back only while the text so far could still be one of them.
+    """
+    chunks = iter(chunks)
+    held = []
+    for chunk in chunks:
+        held.append(chunk)
+        text = "".join(held).strip()
+        if not any(reply.startswith(text) for reply in whole_replies):
+            break
+    else:
+        text = "".join(held).strip()
+        if text in whole_replies:
+            yield text
+            return
+    yield from iter_sentences(itertools.chain(held, chunks), min_chars)
@@ -0,0 +1,108 @@
+# module/session.py
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def estimate_chat_size(chat):
+    """Rough memory footprint of a chat session, in bytes of history text"""
+    size = 0
+    for content in getattr(chat, "history", None) or []:
+        for part in getattr(content, "parts", None) or []:
+            size += len(getattr(part, "text", "") or "")
+    return size
+
+class ChatSessionStore:
+    """One chat object per client, bounded by session count, idle time and history bytes"""
+
+    def __init__(self, factory, max_sessions=500, idle_timeout=1800, max_bytes=64 * 1024 * 1024):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()  # session id -> entry, least recently used first
+        self._total_bytes = 0
+        self._evicted = 0
+        self._lock = threading.Lock()
+
+    def _drop(self, session_id):
+        entry = self._sessions.pop(session_id)
+        self._total_bytes -= entry['size']
+        self._evicted += 1
+
+    def _evict(self):
+        now = time.time()
+        # Idle sessions sit at the front, so stop at the first recently used one
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if now - entry['last_used'] < self.idle_timeout:
+                break
+            self._drop(session_id)
+        while self._sessions and (len(self._sessions) > self.max_sessions or self._total_bytes > self.max_bytes):
+            self._drop(next(iter(self._sessions)))
+
+    def _get_or_create(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry:
+                entry['last_used'] = time.time()
+                self._sessions.move_to_end(session_id)
+                return entry
+
+        # Creating a chat may hit the network, so don't hold the store lock for it
+        chat = self.factory()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if not entry:
+                entry = {
+                    'chat': chat,
+                    'last_used': time.time(),
+                    'size': 0,
+                    'lock': threading.Lock()
+                }
+                self._sessions[session_id] = entry
+                self._evict()
+                logger.debug(f"Created chat session {session_id[:8]}... ({len(self._sessions)} live)")
+            return entry
+
+    @contextmanager
+    def use(self, session_id):
+        """Hold a client's chat for one turn and re-account its size afterwards"""
+        entry = self._get_or_create(session_id)
+        with entry['lock']:
+            try:
+                yield entry['chat']
+            finally:
+                try:
+                    size = estimate_chat_size(entry['chat'])
+                except Exception as e:
+                    # Reading history can raise (e.g. after a broken stream); don't mask the turn's own error
+                    logger.error(f"Error estimating chat session size: {e!r}")
+                    size = entry['size']
+                with self._lock:
+                    if self._sessions.get(session_id) is entry:
+                        self._total_bytes += size - entry['size']
+                        entry['last_used'] = time.time()
+                        self._evict()
+                    entry['size'] = size
+
+    def discard(self, session_id):
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+
+    def stats(self):
+        with self._lock:
+            self._evict()
+            return {
+                'sessions': len(self._sessions),
+                'bytes': self._total_bytes,
+                'evicted': self._evicted,
+                'max_sessions': self.max_sessions,
+                'max_bytes': self.max_bytes
+            }
@@ -0,0 +1,67 @@
+# module/singleflight.py
+import asyncio
+import logging
+import threading
+import concurrent.futures
+
+from module import metrics
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """Merges concurrent calls that share a key onto one execution.
+
+    The first caller for a key runs the work; callers arriving while it is in
+    flight wait for the same result (or exception) instead of repeating it.
+    Nothing is kept once the call finishes, so this is not a cache.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}  # key -> concurrent.futures.Future, for do()
+        self._tasks = {}  # (loop, key) -> asyncio.Task, for do_async()
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout=None):
+        """Call fn() once for all threads asking for key at the same time"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = concurrent.futures.Future()
+        if not leader:
+            metrics.coalesced_calls.inc(self.name)
+            logger.debug(f"Joined in-flight {self.name} call for {key!r}")
+            return future.result(timeout)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def do_async(self, key, coro_fn):
+        """Await coro_fn() once for all coroutines on this loop asking for key at the same time"""
+        # Tasks belong to one loop, and a forked worker starts a new one
+        task_key = (asyncio.get_running_loop(), key)
+        task = self._tasks.get(task_key)
+        if task is None:
+            task = self._tasks[task_key] = asyncio.ensure_future(coro_fn())
+            task.add_done_callback(lambda done: self._forget(task_key, done))
+        else:
+            metrics.coalesced_calls.inc(self.name)
+            logger.debug(f"Joined in-flight {self.name} call for {key!r}")
+        # A waiter that gives up must not cancel the call for everyone else
+        return await asyncio.shield(task)
+
+    def _forget(self, task_key, task):
+        if self._tasks.get(task_key) is task:
+            del self._tasks[task_key]
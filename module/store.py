@@ -0,0 +1,203 @@
+# module/store.py
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# One database file on the host, shared by every gunicorn worker
+STATE_DB_PATH = os.environ.get("STATE_DB_PATH", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "jessie-state.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT,
+    size INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_by_age ON entries (namespace, updated_at);
+CREATE INDEX IF NOT EXISTS entries_by_expiry ON entries (expires_at) WHERE expires_at IS NOT NULL;
+CREATE TABLE IF NOT EXISTS totals (
+    namespace TEXT PRIMARY KEY,
+    entries INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+def normalize_key(key):
+    """Case- and whitespace-insensitive form of a free-text key (song names, queries)"""
+    return " ".join(str(key).lower().split())
+
+class SharedStore:
+    """Namespaced key/value entries with TTLs, shared across worker processes.
+
+    Backed by SQLite in WAL mode: lookups go through the primary key, oldest-first
+    scans through an (namespace, updated_at) index, and per-namespace entry and byte
+    totals are kept in step with every write so they never need a scan.
+    """
+
+    def __init__(self, path, purge_interval=60):
+        self.path = path
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._last_purge = 0
+
+    def _connect(self):
+        # sqlite3 connections can't be shared between threads or across fork
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _write(self, callback):
+        """Run callback(conn) in a write transaction and return its result"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = callback(conn)
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _adjust(conn, namespace, entries, size):
+        conn.execute(
+            "INSERT INTO totals (namespace, entries, bytes) VALUES (?, ?, ?) "
+            "ON CONFLICT (namespace) DO UPDATE SET entries = entries + excluded.entries, bytes = bytes + excluded.bytes",
+            (namespace, entries, size))
+
+    def set(self, namespace, key, value=None, size=0, ttl=None, timestamp=None):
+        """Insert or replace an entry; ttl is in seconds, timestamp orders oldest()"""
+        now = time.time()
+        updated_at = now if timestamp is None else timestamp
+        expires_at = now + ttl if ttl else None
+
+        def write(conn):
+            previous = conn.execute("SELECT size FROM entries WHERE namespace = ? AND key = ?",
+                                    (namespace, key)).fetchone()
+            conn.execute("INSERT OR REPLACE INTO entries (namespace, key, value, size, updated_at, expires_at) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", (namespace, key, value, size, updated_at, expires_at))
+            if previous:
+                self._adjust(conn, namespace, 0, size - previous[0])
+            else:
+                self._adjust(conn, namespace, 1, size)
+
+        self._write(write)
+        self._maybe_purge()
+
+    def add(self, namespace, key, value=None, size=0, ttl=None):
+        """Insert an entry only if there is no live one; returns True only for the caller that inserted it"""
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+
+        def write(conn):
+            previous = conn.execute("SELECT size, expires_at FROM entries WHERE namespace = ? AND key = ?",
+                                    (namespace, key)).fetchone()
+            if previous and (previous[1] is None or previous[1] > now):
+                return False
+            conn.execute("INSERT OR REPLACE INTO entries (namespace, key, value, size, updated_at, expires_at) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", (namespace, key, value, size, now, expires_at))
+            if previous:
+                self._adjust(conn, namespace, 0, size - previous[0])
+            else:
+                self._adjust(conn, namespace, 1, size)
+            return True
+
+        return self._write(write)
+
+    def get(self, namespace, key, default=None):
+        row = self._connect().execute(
+            "SELECT value FROM entries WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, key, time.time())).fetchone()
+        return row[0] if row else default
+
+    def contains(self, namespace, key):
+        return self._connect().execute(
+            "SELECT 1 FROM entries WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, key, time.time())).fetchone() is not None
+
+    def touch(self, namespace, key, timestamp=None):
+        """Mark an entry as just used; returns False if it doesn't exist"""
+        cursor = self._connect().execute(
+            "UPDATE entries SET updated_at = ? WHERE namespace = ? AND key = ?",
+            (time.time() if timestamp is None else timestamp, namespace, key))
+        return cursor.rowcount > 0
+
+    def delete(self, namespace, key):
+        """Remove an entry; returns True only for the caller that actually removed it"""
+        def write(conn):
+            row = conn.execute("SELECT size FROM entries WHERE namespace = ? AND key = ?",
+                               (namespace, key)).fetchone()
+            if not row:
+                return False
+            conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+            self._adjust(conn, namespace, -1, -row[0])
+            return True
+
+        return self._write(write)
+
+    def oldest(self, namespace, limit=1):
+        """Least recently updated entries as (key, size, updated_at), oldest first"""
+        return self._connect().execute(
+            "SELECT key, size, updated_at FROM entries WHERE namespace = ? ORDER BY updated_at LIMIT ?",
+            (namespace, limit)).fetchall()
+
+    def recent(self, namespace, limit):
+        """Values of the most recently updated live entries, newest first"""
+        rows = self._connect().execute(
+            "SELECT value FROM entries WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?) "
+            "ORDER BY updated_at DESC LIMIT ?", (namespace, time.time(), limit)).fetchall()
+        return [row[0] for row in rows]
+
+    def trim(self, namespace, max_entries):
+        """Delete the oldest entries beyond max_entries"""
+        count, _ = self.totals(namespace)
+        for key, _, _ in self.oldest(namespace, max(0, count - max_entries)):
+            self.delete(namespace, key)
+
+    def totals(self, namespace):
+        """(entries, bytes) for a namespace, including entries not yet purged"""
+        row = self._connect().execute("SELECT entries, bytes FROM totals WHERE namespace = ?",
+                                      (namespace,)).fetchone()
+        return (row[0], row[1]) if row else (0, 0)
+
+    def purge_expired(self):
+        """Delete entries past their TTL in every namespace"""
+        def write(conn):
+            now = time.time()
+            rows = conn.execute("SELECT namespace, COUNT(*), COALESCE(SUM(size), 0) FROM entries "
+                                "WHERE expires_at IS NOT NULL AND expires_at <= ? GROUP BY namespace",
+                                (now,)).fetchall()
+            conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+            for namespace, count, size in rows:
+                self._adjust(conn, namespace, -count, -size)
+            return sum(row[1] for row in rows)
+
+        self._last_purge = time.monotonic()
+        return self._write(write)
+
+    def _maybe_purge(self):
+        if time.monotonic() - self._last_purge > self.purge_interval:
+            try:
+                self.purge_expired()
+            except Exception as e:
+                logger.error(f"Error purging expired entries: {e}")
+
+shared_store = SharedStore(STATE_DB_PATH)
@@ -0,0 +1,136 @@
+# module/tts_cache.py
+import os
+import time
+import hashlib
+import logging
+import threading
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class TTSCache:
+    """Content-addressed on-disk cache of synthesized speech with LRU eviction under a byte budget.
+
+    The index (clip sizes and last use, keyed by file name) lives in a SharedStore
+    namespace, so every worker sees the same clips, usage order and byte total.
+    One budget covers every audio format.
+    """
+
+    def __init__(self, directory, max_bytes, store, namespace="tts_clips", extension="mp3",
+                 extensions=(".mp3",)):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.store = store
+        self.namespace = namespace
+        self.extension = extension
+        self.extensions = extensions
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(text, voice, audio_format=None):
+        """Stable digest of the final TTS text, voice and format (unlike hash(), not salted per process)"""
+        # Native clips keep the original format-less key, so existing files stay valid
+        if audio_format and audio_format != "mp3":
+            return hashlib.sha256(f"{voice}\n{audio_format}\n{text}".encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{voice}\n{text}".encode("utf-8")).hexdigest()
+
+    def filename_for(self, key, extension=None):
+        return f"{key}.{extension or self.extension}"
+
+    def path_for(self, key, extension=None):
+        return os.path.join(self.directory, self.filename_for(key, extension))
+
+    def _load(self):
+        """Index clips left on disk from before the shared index existed (once per process)"""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if self.store.totals(self.namespace)[0]:
+                return
+            count = 0
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith(self.extensions):
+                    stat = entry.stat()
+                    self.store.set(self.namespace, entry.name, size=stat.st_size, timestamp=stat.st_mtime)
+                    count += 1
+            logger.info(f"TTS cache indexed {count} clips")
+            self._evict()
+        except Exception as e:
+            logger.error(f"Error loading TTS cache index: {e}")
+
+    def _evict(self):
+        while self.store.totals(self.namespace)[1] > self.max_bytes:
+            oldest = self.store.oldest(self.namespace, 16)
+            if not oldest:
+                break
+            for filename, size, _ in oldest:
+                # Only the worker that removes the index entry deletes the file
+                if not self.store.delete(self.namespace, filename):
+                    continue
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                    logger.debug(f"Evicted cached clip {filename}")
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    logger.error(f"Error evicting cached clip {filename}: {e}")
+                if self.store.totals(self.namespace)[1] <= self.max_bytes:
+                    return
+
+    def get(self, key, extension=None):
+        """Return cached audio bytes for key, or None on a miss"""
+        self._load()
+        filename = self.filename_for(key, extension)
+        path = os.path.join(self.directory, filename)
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            # Evicted since it was indexed, or never written
+            return None
+        except Exception as e:
+            logger.error(f"Error reading cached clip {key}: {e}")
+            return None
+
+        try:
+            if not self.store.touch(self.namespace, filename):
+                self.store.set(self.namespace, filename, size=len(content))
+        except Exception as e:
+            logger.error(f"Error updating TTS cache index for {key}: {e}")
+        return content
+
+    def put(self, key, content, extension=None):
+        """Store audio bytes under key and evict least recently used clips over budget"""
+        if not content:
+            return
+        self._load()
+        filename = self.filename_for(key, extension)
+        try:
+            path = os.path.join(self.directory, filename)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)  # Atomic, so other workers never read partial clips
+        except Exception as e:
+            logger.error(f"Error writing cached clip {key}: {e}")
+            return
+
+        try:
+            self.store.set(self.namespace, filename, size=len(content), timestamp=time.time())
+            self._evict()
+        except Exception as e:
+            logger.error(f"Error updating TTS cache index for {key}: {e}")
+
+    def stats(self):
+        self._load()
+        clips, total_bytes = self.store.totals(self.namespace)
+        return {
+            "clips": clips,
+            "bytes": total_bytes,
+            "max_bytes": self.max_bytes
+        }
@@ -5,25 +5,74 @@ import time
 import logging
 import io
 import asyncio
+import weakref
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Try to import speech recognition and edge_tts
-try:
-    import speech_recognition as sr
-    has_speech_recognition = True
-except ImportError:
-    logger.warning("speech_recognition module not found. Voice input will not work.")
-    has_speech_recognition = False
-
-try:
-    import edge_tts
-    has_edge_tts = True
-except ImportError:
-    logger.warning("edge_tts module not found. Voice output will not work.")
-    has_edge_tts = False
+# speech_recognition and edge_tts are imported on first use to keep startup fast;
+# the flags turn False once an import has failed
+has_speech_recognition = True
+has_edge_tts = True
+_edge_tts = None
+
+def load_edge_tts():
+    """Import edge_tts on first use, returning None when it isn't installed"""
+    global _edge_tts, has_edge_tts
+    if _edge_tts is None and has_edge_tts:
+        try:
+            import edge_tts
+            _edge_tts = edge_tts
+        except ImportError:
+            logger.warning("edge_tts module not found. Voice output will not work.")
+            has_edge_tts = False
+    return _edge_tts
+
+from module import runtime, metrics
+from module.sentences import split_sentences
+from module.tts_cache import TTSCache
+from module.janitor import AudioJanitor
+from module.store import shared_store
+from module.singleflight import SingleFlight
+from module.audio_format import NATIVE_FORMAT, AUDIO_EXTENSIONS, content_filename, extension_for, transcode
+from module.audio_processing import load_pcm, trim_silence, postprocess_clip
+from module.voice_health import VoicePool
+from module.phrase_bundle import phrase_bundle
+
+# Seconds a sync caller waits on synthesis (or on each streamed chunk)
+TTS_TIMEOUT = float(os.environ.get("TTS_TIMEOUT_SECONDS", 30))
+# Per-voice deadlines: a voice that sends no audio within TTS_FIRST_CHUNK_SECONDS,
+# or stalls for TTS_CHUNK_SECONDS mid-clip, counts as failed and the next voice is tried
+TTS_FIRST_CHUNK_SECONDS = float(os.environ.get("TTS_FIRST_CHUNK_SECONDS", 5))
+TTS_CHUNK_SECONDS = float(os.environ.get("TTS_CHUNK_SECONDS", 5))
+
+# Synthesized clips are cached by content so repeated lines skip edge_tts entirely
+AUDIO_DIR = os.environ.get("AUDIO_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "audio"))
+TTS_CACHE_MAX_BYTES = int(os.environ.get("TTS_CACHE_MAX_BYTES", 100 * 1024 * 1024))
+TTS_CACHE_DIR = os.environ.get("TTS_CACHE_DIR", os.path.join(AUDIO_DIR, "cache"))
+tts_cache = TTSCache(TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES, shared_store, extensions=AUDIO_EXTENSIONS)
+
+# Per-reply clips in AUDIO_DIR are deleted after 5 minutes, or sooner past 50MB
+audio_janitor = AudioJanitor(AUDIO_DIR, shared_store, max_age=300, max_bytes=50 * 1024 * 1024,
+                             interval=int(os.environ.get("AUDIO_CLEANUP_INTERVAL_SECONDS", 60)),
+                             extension=AUDIO_EXTENSIONS)
+
+# Texts at least this long are split at sentence boundaries and synthesized as
+# parallel edge_tts jobs, at most TTS_CONCURRENCY at once per worker
+TTS_SPLIT_MIN_CHARS = int(os.environ.get("TTS_SPLIT_MIN_CHARS", 200))
+TTS_SEGMENT_MIN_CHARS = int(os.environ.get("TTS_SEGMENT_MIN_CHARS", 60))
+TTS_CONCURRENCY = int(os.environ.get("TTS_CONCURRENCY", 4))
+_segment_semaphores = weakref.WeakKeyDictionary()
+
+# Concurrent requests for the same text share one synthesis
+_segment_flights = SingleFlight("tts_segment")
+_synthesis_flights = SingleFlight("tts")
+_encode_flights = SingleFlight("transcode")
+
+# Uploaded speech goes to Google's recognizer, with CMU Sphinx as the offline fallback;
+# set TRANSCRIBE_ENGINE=sphinx to stay offline entirely
+TRANSCRIBE_ENGINE = os.environ.get("TRANSCRIBE_ENGINE", "google").lower()
 
 # Rude Indian teen configuration with explicit language
 SASSY_PHRASES = {
@@ -206,21 +255,29 @@ INDIAN_PRONUNCIATION = {
     "dumb-ass": "dumb-ass"
 }
 
+# Emojis stripped from replies before they are spoken
+EMOJIS = ("💀", "🖤", "😒", "🙄", "🤣", "😂", "😤", "🙃", "❤️", "👍", "👎", "👏")
+
+# Text rules are prepared once at import. Short str.replace chains are kept as they
+# are since CPython runs each one in C, faster than an equivalent combined regex
+_SASSY_REPLACEMENTS = tuple((polite.lower(), rude) for polite, rude in SASSY_PHRASES.items())
+
 def make_emo(text):
     """Add rude Indian girl flavor to responses with explicit language"""
     if not text:
         return "Whatever the fuck..."
         
     original_text = text
-    text = text.lower()
+    lower_text = text.lower()
     
     # Replace polite phrases with rude alternatives
-    for polite, rude in SASSY_PHRASES.items():
-        text = text.replace(polite.lower(), rude)
+    text = lower_text
+    for polite, rude in _SASSY_REPLACEMENTS:
+        text = text.replace(polite, rude)
     
     # Only apply transformations if text was actually modified
     # Otherwise keep original capitalization
-    if text != original_text.lower():
+    if text != lower_text:
         text = text.capitalize()
     else:
         text = original_text
@@ -249,184 +306,348 @@ def make_emo(text):
     if random.random() > 0.5:
         text += random.choice(RUDE_SUFFIXES)
     
-    # Strip emojis from text (simple approach - remove common emoji patterns)
-    text = text.replace("💀", "").replace("🖤", "").replace("😒", "").replace("🙄", "")
-    text = text.replace("🤣", "").replace("😂", "").replace("😤", "").replace("🙃", "")
-    text = text.replace("❤️", "").replace("👍", "").replace("👎", "").replace("👏", "")
+    # Strip emojis from text (an all-ASCII reply can't contain any)
+    if not text.isascii():
+        for emoji in EMOJIS:
+            text = text.replace(emoji, "")
     
     return text
 
 def enhance_indian_pronunciation(text):
     """Enhance Indian pronunciation in text"""
     # Remove any special characters that might be spelled out
-    text = text.replace('"', '').replace('"', '').replace('*', '').replace('_', '')
+    text = text.replace('"', '').replace('*', '').replace('_', '')
     
-    words = text.split()
-    enhanced_words = []
+    # One lookup per word, preserving original capitalization
+    lookup = INDIAN_PRONUNCIATION.get
+    return " ".join([
+        word if (spoken := lookup(word.lower())) is None
+        else (spoken.capitalize() if word[0].isupper() else spoken)
+        for word in text.split()
+    ])
+
+# Voices to try in order when the preferred one is unavailable
+VOICE_FALLBACKS = [
+    "en-IN-NeerjaNeural",  # Indian female voice
+    "en-US-AriaNeural",    # US female voice as fallback
+    "en-GB-SoniaNeural"    # UK female voice as last resort
+]
+voice_pool = VoicePool(VOICE_FALLBACKS)
+
+def prepare_speech_text(text, emo=True):
+    """Turn a reply into the expressive text that gets sent to the TTS voice"""
+    # Fixed lines are spoken as written, so they match their pre-rendered clips
+    if emo and text in phrase_bundle.phrases():
+        emo = False
+
+    # Remove any special characters that might be spelled out
+    text = text.replace('"', '').replace('*', '').replace('_', '')
     
-    for word in words:
-        # Convert to lowercase for matching
-        lower_word = word.lower()
-        
-        # Check if word needs Indian pronunciation
-        if lower_word in INDIAN_PRONUNCIATION:
-            # Preserve original capitalization
-            if word[0].isupper():
-                enhanced_word = INDIAN_PRONUNCIATION[lower_word].capitalize()
-            else:
-                enhanced_word = INDIAN_PRONUNCIATION[lower_word]
-            enhanced_words.append(enhanced_word)
-        else:
-            enhanced_words.append(word)
+    emo_text = make_emo(text) if emo else text
+    logger.info(f"[RUDE INDIAN GIRL]: {emo_text}")
+
+    # Enhance Indian pronunciation
+    indian_text = enhance_indian_pronunciation(emo_text)
     
-    return ' '.join(enhanced_words)
+    # Add more expressive pauses and emphasis, but handle special characters properly
+    expressive_text = indian_text.replace(".", "...").replace("!", "!...").replace("?", "?...")
+    logger.debug(f"Expressive text: {expressive_text}")
+    return expressive_text
 
-async def speak(text):
-    """Use Microsoft Edge TTS with Indian teen attitude"""
-    if not has_edge_tts:
+async def _audio_chunks(expressive_text, voice):
+    """Yield MP3 chunks from one edge_tts voice, raising TimeoutError if it misses a deadline"""
+    stream = load_edge_tts().Communicate(expressive_text, voice).stream()
+    timeout = TTS_FIRST_CHUNK_SECONDS
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(stream.__anext__(), timeout)
+            except StopAsyncIteration:
+                return
+            if chunk["type"] == "audio":
+                timeout = TTS_CHUNK_SECONDS
+                yield chunk["data"]
+    finally:
+        await stream.aclose()
+
+def get_cached_speech(expressive_text):
+    """Look up a cached clip for the text in any of the voices, returning (key, content).
+
+    Blocking (file reads and SQLite writes); async code runs it with asyncio.to_thread.
+    """
+    for voice in VOICE_FALLBACKS:
+        key = tts_cache.make_key(expressive_text, voice)
+        content = phrase_bundle.get(tts_cache.filename_for(key)) or tts_cache.get(key)
+        if content:
+            logger.debug(f"TTS cache hit for {key}")
+            metrics.record_cache("tts", True)
+            return key, content
+    metrics.record_cache("tts", False)
+    return None, None
+
+def split_for_tts(expressive_text):
+    """Split long text into sentence segments that can be synthesized in parallel"""
+    if len(expressive_text) < TTS_SPLIT_MIN_CHARS:
+        return [expressive_text]
+    return split_sentences(expressive_text, min_chars=TTS_SEGMENT_MIN_CHARS) or [expressive_text]
+
+def _get_segment_semaphore():
+    # Semaphores bind to the loop they're first used on, so keep one per loop
+    loop = asyncio.get_running_loop()
+    semaphore = _segment_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _segment_semaphores[loop] = asyncio.Semaphore(TTS_CONCURRENCY)
+    return semaphore
+
+async def _stream_segment(expressive_text):
+    """Yield MP3 chunks for one segment as edge_tts produces them, caching the finished clip"""
+    key, content = await asyncio.to_thread(get_cached_speech, expressive_text)
+    if content:
+        yield content
+        return
+
+    if load_edge_tts() is None:
         logger.warning("edge_tts not available. Using text-only response.")
-        return None
-        
+        return
+
+    for voice in voice_pool.candidates():
+        start = time.perf_counter()
+        first_chunk = None
+        memory_stream = io.BytesIO()
+        try:
+            async for data in _audio_chunks(expressive_text, voice):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - start
+                    metrics.record("tts_first_chunk", first_chunk)
+                memory_stream.write(data)
+                yield data
+            if first_chunk is None:
+                raise RuntimeError("no audio received")
+        except Exception as e:
+            voice_pool.record_failure(voice)
+            # Once audio has gone out, switching voices would restart the clip
+            if first_chunk is not None:
+                raise
+            logger.error(f"TTS voice {voice} failed, trying the next one: {e!r}")
+            continue
+        voice_pool.record_success(voice, first_chunk)
+        metrics.record("tts", time.perf_counter() - start)
+        break
+    else:
+        logger.error("No TTS voice available. Using text-only response.")
+        return
+
+    # Only complete clips reach the cache; an abandoned stream never gets here.
+    # This first listener hears the raw clip, later ones the processed one.
+    content = await asyncio.to_thread(postprocess_clip, memory_stream.getvalue())
+    with metrics.timed("tts_cache_write"):
+        await asyncio.to_thread(tts_cache.put, tts_cache.make_key(expressive_text, voice), content)
+
+async def _synthesize_segment(expressive_text):
+    """Return (cache key, MP3 bytes) for one segment, limited to TTS_CONCURRENCY jobs at once"""
+    return await _segment_flights.do_async(expressive_text, lambda: _synthesize_segment_once(expressive_text))
+
+async def _synthesize_segment_once(expressive_text):
+    key, content = await asyncio.to_thread(get_cached_speech, expressive_text)
+    if content:
+        return key, content
+
+    if load_edge_tts() is None:
+        logger.warning("edge_tts not available. Using text-only response.")
+        return None, None
+
+    async with _get_segment_semaphore():
+        # The whole clip is buffered, so a voice can be replaced at any point
+        for voice in voice_pool.candidates():
+            start = time.perf_counter()
+            first_chunk = None
+            # Use memory stream to avoid file system operations until needed
+            memory_stream = io.BytesIO()
+            try:
+                async for data in _audio_chunks(expressive_text, voice):
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter() - start
+                    memory_stream.write(data)
+                if first_chunk is None:
+                    raise RuntimeError("no audio received")
+            except Exception as e:
+                voice_pool.record_failure(voice)
+                logger.error(f"TTS voice {voice} failed, trying the next one: {e!r}")
+                continue
+            voice_pool.record_success(voice, first_chunk)
+            metrics.record("tts", time.perf_counter() - start)
+            break
+        else:
+            logger.error("No TTS voice available. Using text-only response.")
+            return None, None
+
+    key = tts_cache.make_key(expressive_text, voice)
+    # Trimmed and levelled once here rather than on every play in the browser
+    content = await asyncio.to_thread(postprocess_clip, memory_stream.getvalue())
+    with metrics.timed("tts_cache_write"):
+        await asyncio.to_thread(tts_cache.put, key, content)
+    return key, content
+
+def _join_segments(expressive_text, contents):
+    """Concatenate segment clips and cache the result under the full text (blocking)"""
+    # edge_tts emits bare MP3 frames with no container, so clips join byte for byte
+    content = b"".join(contents)
+    key = tts_cache.make_key(expressive_text, VOICE_FALLBACKS[0])
+    with metrics.timed("tts_cache_write"):
+        tts_cache.put(key, content)
+    return key, content
+
+async def speak_stream(expressive_text, audio_format=NATIVE_FORMAT):
+    """Yield MP3 chunks for already-prepared text as edge_tts produces them"""
+    if not expressive_text:
+        logger.warning("No text provided for speech")
+        return
+
+    if audio_format != NATIVE_FORMAT:
+        # Transcoding needs the whole clip, so other formats arrive in one piece
+        key, content = await synthesize(expressive_text, audio_format)
+        if content:
+            yield content
+        return
+
+    segments = split_for_tts(expressive_text)
+    if len(segments) == 1:
+        logger.debug("Streaming audio...")
+        async for data in _stream_segment(expressive_text):
+            yield data
+        logger.debug("Audio stream finished")
+        return
+
+    key, content = await asyncio.to_thread(get_cached_speech, expressive_text)
+    if content:
+        yield content
+        return
+
+    # Stream the first sentence live while the rest synthesize concurrently
+    logger.debug(f"Streaming audio in {len(segments)} segments...")
+    tasks = [asyncio.ensure_future(_synthesize_segment(segment)) for segment in segments[1:]]
+    try:
+        async for data in _stream_segment(segments[0]):
+            yield data
+        # Join the processed first clip that streaming just cached, not the raw chunks
+        key, content = await _synthesize_segment(segments[0])
+        contents = [content] if content else []
+        for task in tasks:
+            key, content = await task
+            if content:
+                contents.append(content)
+                yield content
+        await asyncio.to_thread(_join_segments, expressive_text, contents)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def synthesize(expressive_text, audio_format=NATIVE_FORMAT):
+    """Return (cache key, audio bytes) for prepared text, from the cache or fresh edge_tts jobs"""
+    if audio_format != NATIVE_FORMAT:
+        return await _encode_flights.do_async((expressive_text, audio_format),
+                                              lambda: _encode_once(expressive_text, audio_format))
+    return await _synthesis_flights.do_async(expressive_text, lambda: _synthesize_once(expressive_text))
+
+def _cached_encoding(key, extension):
+    """A transcoded clip from the phrase bundle or the TTS cache (blocking)"""
+    return phrase_bundle.get(tts_cache.filename_for(key, extension)) or tts_cache.get(key, extension)
+
+async def _encode_once(expressive_text, audio_format):
+    key = tts_cache.make_key(expressive_text, VOICE_FALLBACKS[0], audio_format)
+    extension = extension_for(audio_format)
+    content = await asyncio.to_thread(_cached_encoding, key, extension)
+    metrics.record_cache(f"tts_{audio_format}", bool(content))
+    if content:
+        return key, content
+
+    native_key, native_content = await synthesize(expressive_text)
+    if not native_content:
+        return None, None
+    content = await asyncio.to_thread(transcode, native_content, audio_format)
+    with metrics.timed("tts_cache_write"):
+        await asyncio.to_thread(tts_cache.put, key, content, extension)
+    return key, content
+
+async def _synthesize_once(expressive_text):
+    segments = split_for_tts(expressive_text)
+    if len(segments) == 1:
+        return await _synthesize_segment(expressive_text)
+
+    key, content = await asyncio.to_thread(get_cached_speech, expressive_text)
+    if content:
+        return key, content
+
+    # Long replies are synthesized sentence by sentence, concurrently, then joined in order
+    logger.debug(f"Generating audio in {len(segments)} segments...")
+    results = await asyncio.gather(*(_synthesize_segment(segment) for segment in segments))
+    contents = [content for key, content in results if content]
+    if not contents:
+        return None, None
+    return await asyncio.to_thread(_join_segments, expressive_text, contents)
+
+async def speak(text, audio_format=NATIVE_FORMAT):
+    """Use Microsoft Edge TTS with Indian teen attitude"""
     try:
         if not text:
             logger.warning("No text provided for speech")
             return None
             
-        # Remove any special characters that might be spelled out
-        text = text.replace('"', '').replace('"', '').replace('*', '').replace('_', '')
-        
-        emo_text = make_emo(text)
-        logger.info(f"[RUDE INDIAN GIRL]: {emo_text}")
+        expressive_text = prepare_speech_text(text)
 
-        # Enhance Indian pronunciation
-        indian_text = enhance_indian_pronunciation(emo_text)
-        
-        # Add more expressive pauses and emphasis, but handle special characters properly
-        expressive_text = indian_text.replace(".", "...").replace("!", "!...").replace("?", "?...")
-        logger.debug(f"Expressive text: {expressive_text}")
-        
-        # Generate unique filename (don't save to disk yet)
-        filename = f"{int(time.time())}_{hash(text) % 10000}.mp3"
-        logger.debug(f"Audio filename: {filename}")
-
-        # Create communicate object with voice settings
         try:
-            # Using a female Indian voice with basic settings
-            communicate = edge_tts.Communicate(
-                expressive_text,
-                "en-IN-NeerjaNeural"  # Indian female voice
-            )
-            logger.debug("Communicate object created successfully")
-        except Exception as e:
-            logger.error(f"Error creating communicate object: {e}")
-            # Fallback to alternative voice
-            try:
-                # Try with more common voice if Indian voice fails
-                communicate = edge_tts.Communicate(
-                    expressive_text,
-                    "en-US-AriaNeural"  # US female voice as fallback
-                )
-                logger.debug("Using fallback US voice")
-            except Exception as e2:
-                logger.error(f"Error creating fallback communicate object: {e2}")
-                # Last resort fallback
-                communicate = edge_tts.Communicate(
-                    expressive_text,
-                    "en-GB-SoniaNeural"  # UK female voice as last resort
-                )
-                logger.debug("Using last resort UK voice")
-
-        # Use memory stream to avoid file system operations until needed
-        memory_stream = io.BytesIO()
-        try:
-            logger.debug("Generating audio...")
-            # Use communicate.stream() instead of stream_to_buffer
-            async for chunk in communicate.stream():
-                if chunk["type"] == "audio":
-                    memory_stream.write(chunk["data"])
-            logger.debug("Audio generated successfully")
-            
-            # Get the audio content
-            audio_content = memory_stream.getvalue()
-            
-            # Return filename and content for further processing
-            return {
-                "filename": filename,
-                "content": audio_content
-            }
+            key, content = await synthesize(expressive_text, audio_format)
         except Exception as e:
-            logger.error(f"Error generating audio: {e}")
+            if audio_format == NATIVE_FORMAT:
+                logger.error(f"Error generating audio: {e}")
+                return None
+            logger.error(f"Error encoding audio as {audio_format}, sending MP3: {e}")
+            return await speak(text, NATIVE_FORMAT)
+        if not content:
             return None
+        
+        # Filenames are a digest of the clip's bytes, so a name never serves different audio
+        filename = content_filename(content, audio_format)
+        logger.debug(f"Audio filename: {filename}")
+        return {
+            "filename": filename,
+            "content": content
+        }
 
     except Exception as e:
         logger.error(f"Text-to-speech error: {e}")
         return None
 
-def speak_sync(text):
+def speak_sync(text, audio_format=NATIVE_FORMAT):
     """Synchronous wrapper for speak function"""
     try:
-        # Create a new event loop if one doesn't exist
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(speak(text))
-        loop.close()
-        return result
+        return runtime.run(speak(text, audio_format), timeout=TTS_TIMEOUT)
     except Exception as e:
         logger.error(f"Error in speak_sync: {e}")
         return None
 
+def speak_stream_sync(expressive_text, audio_format=NATIVE_FORMAT):
+    """Synchronous generator over speak_stream, for streaming HTTP responses"""
+    try:
+        yield from runtime.iterate(speak_stream(expressive_text, audio_format), timeout=TTS_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Error in speak_stream_sync: {e}")
+
 def cleanup_old_audio_files():
     """Clean up old audio files from the static directory"""
     try:
-        # Get the static audio directory path
-        audio_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "audio")
-        if not os.path.exists(audio_dir):
-            logger.warning(f"Audio directory does not exist: {audio_dir}")
-            return 0
-            
-        current_time = time.time()
-        files_deleted = 0
-        
-        # Get list of files and sort by modification time
-        files = [(os.path.join(audio_dir, f), os.path.getmtime(os.path.join(audio_dir, f))) 
-                for f in os.listdir(audio_dir) 
-                if f.endswith('.mp3')]
-        
-        # Sort by modification time (oldest first)
-        files.sort(key=lambda x: x[1])
-        
-        # Keep track of total file size
-        total_size = sum(os.path.getsize(f[0]) for f in files)
-        
-        # If total size is greater than 50MB, delete more aggressively
-        size_limit = 50 * 1024 * 1024  # 50MB in bytes
-        
-        for file_path, mtime in files:
-            try:
-                # Delete files older than 5 minutes (300 seconds) or if we're over the size limit
-                if current_time - mtime > 300 or total_size > size_limit:
-                    file_size = os.path.getsize(file_path)
-                    os.remove(file_path)
-                    files_deleted += 1
-                    total_size -= file_size
-                    logger.debug(f"Cleaned up old audio file: {os.path.basename(file_path)}")
-                    
-                    # Stop if we've reduced size below 80% of the limit
-                    if total_size < (size_limit * 0.8):
-                        break
-            except Exception as e:
-                logger.error(f"Error cleaning up file {os.path.basename(file_path)}: {e}")
-                continue
-                
-        logger.info(f"Cleanup completed. Deleted {files_deleted} files.")
-        return files_deleted
+        return audio_janitor.sweep()
     except Exception as e:
         logger.error(f"Error in cleanup_old_audio_files: {e}")
         return 0
 
 def listen():
     """Listen with attitude"""
-    if not has_speech_recognition:
+    global has_speech_recognition
+    try:
+        import speech_recognition as sr
+    except ImportError:
+        has_speech_recognition = False
         logger.warning("speech_recognition module not available. Cannot use voice input.")
         return None
         
@@ -484,14 +705,7 @@ def listen():
                     logger.info(f"You said: {text}")
                     
                     # Clean up the text to prevent duplicate words
-                    words = text.split()
-                    cleaned_words = []
-                    for word in words:
-                        if not cleaned_words or word.lower() != cleaned_words[-1].lower():
-                            cleaned_words.append(word)
-                    cleaned_text = ' '.join(cleaned_words)
-                    
-                    return cleaned_text
+                    return dedupe_words(text)
                 except sr.UnknownValueError:
                     logger.debug("Speech not understood")
                     continue
@@ -510,4 +724,55 @@ def listen():
             continue
     
     logger.error("No working microphone found")
-    return None
\ No newline at end of file
+    return None
+
+def dedupe_words(text):
+    """Drop immediately repeated words, which recognizers sometimes emit"""
+    cleaned_words = []
+    for word in text.split():
+        if not cleaned_words or word.lower() != cleaned_words[-1].lower():
+            cleaned_words.append(word)
+    return ' '.join(cleaned_words)
+
+def transcribe(content, content_type=None):
+    """Recognize speech in an uploaded clip after trimming its silence.
+
+    Returns {'text', 'audio_seconds', 'speech_seconds'}; text is empty when no
+    speech was found. Raises RuntimeError if no recognizer is available.
+    """
+    global has_speech_recognition
+    try:
+        import speech_recognition as sr
+    except ImportError:
+        has_speech_recognition = False
+        raise RuntimeError("speech_recognition module not available")
+
+    samples, sample_rate = load_pcm(content, content_type)
+    speech = trim_silence(samples, sample_rate)
+    result = {
+        'text': "",
+        'audio_seconds': round(len(samples) / sample_rate, 2),
+        'speech_seconds': round(len(speech) / sample_rate, 2)
+    }
+    if not len(speech):
+        logger.debug("No speech detected in upload")
+        return result
+
+    audio = sr.AudioData(speech.tobytes(), sample_rate, 2)
+    recognizer = sr.Recognizer()
+    with metrics.timed("stt"):
+        try:
+            if TRANSCRIBE_ENGINE == "sphinx":
+                text = recognizer.recognize_sphinx(audio)
+            else:
+                try:
+                    text = recognizer.recognize_google(audio)
+                except sr.RequestError as e:
+                    logger.error(f"Google Speech Recognition error, trying offline: {e}")
+                    metrics.upstream_errors.inc("stt")
+                    text = recognizer.recognize_sphinx(audio)
+        except sr.UnknownValueError:
+            logger.debug("Speech not understood")
+            return result
+    result['text'] = dedupe_words(text)
+    return result
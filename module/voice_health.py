@@ -0,0 +1,137 @@
+# module/voice_health.py
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+from module import metrics
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# A voice's breaker opens after VOICE_MAX_CONSECUTIVE_FAILURES failures in a row,
+# or when at least half of its last VOICE_WINDOW attempts failed (once it has
+# VOICE_MIN_CALLS of them). It stays open for VOICE_COOLDOWN_SECONDS, doubling on
+# every failed probe up to VOICE_MAX_COOLDOWN_SECONDS.
+VOICE_WINDOW = int(os.environ.get("VOICE_WINDOW", 20))
+VOICE_MIN_CALLS = int(os.environ.get("VOICE_MIN_CALLS", 5))
+VOICE_MAX_ERROR_RATE = float(os.environ.get("VOICE_MAX_ERROR_RATE", 0.5))
+VOICE_MAX_CONSECUTIVE_FAILURES = int(os.environ.get("VOICE_MAX_CONSECUTIVE_FAILURES", 3))
+VOICE_COOLDOWN_SECONDS = float(os.environ.get("VOICE_COOLDOWN_SECONDS", 30))
+VOICE_MAX_COOLDOWN_SECONDS = float(os.environ.get("VOICE_MAX_COOLDOWN_SECONDS", 300))
+# Healthy voices slower than this to the first audio chunk are tried after faster ones
+VOICE_SLOW_SECONDS = float(os.environ.get("VOICE_SLOW_SECONDS", 3))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class VoiceHealth:
+    """Rolling error rate and first-chunk latency of one TTS voice, plus its circuit breaker"""
+
+    def __init__(self, voice):
+        self.voice = voice
+        self.state = CLOSED
+        self._results = deque(maxlen=VOICE_WINDOW)  # (ok, first chunk seconds or None)
+        self._consecutive_failures = 0
+        self._cooldown = VOICE_COOLDOWN_SECONDS
+        self._opened_at = 0
+        self._probe_started = None
+
+    def error_rate(self):
+        if not self._results:
+            return 0.0
+        return sum(1 for ok, _ in self._results if not ok) / len(self._results)
+
+    def latency(self):
+        """Median first-chunk latency of recent successful attempts, or None"""
+        latencies = sorted(seconds for ok, seconds in self._results if ok and seconds is not None)
+        return latencies[len(latencies) // 2] if latencies else None
+
+    def is_slow(self):
+        latency = self.latency()
+        return latency is not None and latency > VOICE_SLOW_SECONDS
+
+    def allow(self, now):
+        """True if a request may use this voice now; half-open voices admit one probe at a time"""
+        if self.state == OPEN and now - self._opened_at >= self._cooldown:
+            self.state = HALF_OPEN
+            self._probe_started = None
+        if self.state == CLOSED:
+            return True
+        # A probe abandoned mid-request never reports back, so it expires after a cooldown
+        if self.state == HALF_OPEN and (self._probe_started is None or now - self._probe_started >= self._cooldown):
+            self._probe_started = now
+            return True
+        return False
+
+    def record_success(self, first_chunk_seconds):
+        self._results.append((True, first_chunk_seconds))
+        self._consecutive_failures = 0
+        if self.state != CLOSED:
+            logger.info(f"TTS voice {self.voice} recovered")
+            self.state = CLOSED
+            self._cooldown = VOICE_COOLDOWN_SECONDS
+
+    def record_failure(self, now):
+        self._results.append((False, None))
+        self._consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            self._cooldown = min(self._cooldown * 2, VOICE_MAX_COOLDOWN_SECONDS)
+            self._open(now)
+        elif self.state == CLOSED and (
+                self._consecutive_failures >= VOICE_MAX_CONSECUTIVE_FAILURES
+                or (len(self._results) >= VOICE_MIN_CALLS and self.error_rate() >= VOICE_MAX_ERROR_RATE)):
+            self._open(now)
+
+    def _open(self, now):
+        self.state = OPEN
+        self._opened_at = now
+        logger.warning(f"TTS voice {self.voice} is failing; skipping it for {self._cooldown:.0f}s")
+
+    def stats(self):
+        latency = self.latency()
+        return {
+            'state': self.state,
+            'error_rate': round(self.error_rate(), 2),
+            'latency_ms': round(latency * 1000) if latency is not None else None,
+            'attempts': len(self._results)
+        }
+
+class VoicePool:
+    """Health of every TTS voice in preference order, shared by all requests in a worker"""
+
+    def __init__(self, voices):
+        self.voices = list(voices)
+        self._health = {voice: VoiceHealth(voice) for voice in self.voices}
+        self._lock = threading.Lock()
+        metrics.Gauge("jessie_tts_open_voices", "TTS voices currently skipped by their circuit breaker",
+                      lambda: sum(1 for health in self._health.values() if health.state == OPEN))
+
+    def candidates(self):
+        """Yield the voices to try for one request, in order, skipping open breakers.
+
+        Each voice is checked only when the previous one has failed, so a request
+        that succeeds on its first voice doesn't use up a recovering voice's probe.
+        """
+        with self._lock:
+            # Stable sort: preference order within the fast and slow groups
+            order = sorted(self.voices, key=lambda voice: self._health[voice].is_slow())
+        for voice in order:
+            with self._lock:
+                allowed = self._health[voice].allow(time.monotonic())
+            if allowed:
+                yield voice
+
+    def record_success(self, voice, first_chunk_seconds):
+        with self._lock:
+            self._health[voice].record_success(first_chunk_seconds)
+
+    def record_failure(self, voice):
+        metrics.upstream_errors.inc("tts")
+        with self._lock:
+            self._health[voice].record_failure(time.monotonic())
+
+    def stats(self):
+        with self._lock:
+            return {voice: health.stats() for voice, health in self._health.items()}
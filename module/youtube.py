@@ -0,0 +1,236 @@
+# module/youtube.py
+import os
+import json
+import time
+import random
+import logging
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from module import metrics
+from module.singleflight import SingleFlight
+from module.store import shared_store
+from module.admission import youtube_limiter, Overloaded
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Get YouTube API key from environment variables
+YOUTUBE_API_KEY = os.environ.get("YOUTUBE_API_KEY")
+if not YOUTUBE_API_KEY:
+    logger.warning("YouTube API key not found in environment variables. YouTube features may not work.")
+
+RANDOM_MUSIC_QUERIES = [
+    "popular hits",
+    "classic rock",
+    "lofi beats",
+    "jazz classics",
+    "electronic dance",
+    "hip hop",
+    "piano instrumental",
+    "ambient background",
+    "indie pop",
+    "workout motivation",
+    "relaxing acoustic",
+    "trending music",
+    "study playlist",
+    "chill vibes"
+]
+
+# Search results are cached per normalized query
+SEARCH_CACHE_TTL = int(os.environ.get("YOUTUBE_CACHE_TTL_SECONDS", 3600))
+SEARCH_CACHE_SIZE = int(os.environ.get("YOUTUBE_CACHE_SIZE", 512))
+# The random music queries never change, so they are kept (and refreshed) for a day
+RANDOM_MUSIC_TTL = int(os.environ.get("YOUTUBE_RANDOM_MUSIC_TTL_SECONDS", 24 * 3600))
+# Warmed results live in shared_store so one worker's searches serve every worker
+# and survive restarts; each worker copies them into its own cache this often
+RANDOM_MUSIC_SYNC_SECONDS = int(os.environ.get("YOUTUBE_RANDOM_MUSIC_SYNC_SECONDS", 600))
+RANDOM_MUSIC_NAMESPACE = "youtube_random_music"
+WARMUP_LEASE_NAMESPACE = "youtube_warmup"
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a per-entry TTL"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+_search_cache = TTLCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+_MISS = object()
+
+# Identical searches that miss the cache at the same time make one API call
+_search_flights = SingleFlight("youtube")
+
+# The discovery document is parsed once per process; httplib2 connections
+# are not thread-safe, so each thread executes requests over its own Http
+_client = None
+_client_lock = threading.Lock()
+_local = threading.local()
+
+def _get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            from googleapiclient.discovery import build
+            _client = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY, cache_discovery=False)
+        return _client
+
+def _get_http():
+    http = getattr(_local, "http", None)
+    if http is None:
+        import httplib2
+        http = _local.http = httplib2.Http(timeout=10)
+    return http
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+def _search(query):
+    """Run one YouTube search and return metadata for the first result"""
+    request = _get_client().search().list(
+        q=query,
+        part='snippet,id',  # Changed from just 'id' to get more metadata
+        type='video',
+        maxResults=5,
+        videoEmbeddable='true'
+    )
+    response = request.execute(http=_get_http())
+    items = response.get('items')
+    if not items:
+        return None
+
+    # Get the first valid result
+    for item in items:
+        video_id = item['id']['videoId']
+        title = item['snippet']['title']
+        channel = item['snippet']['channelTitle']
+        thumbnail = item['snippet']['thumbnails']['medium']['url']
+
+        return {
+            'url': f"https://www.youtube.com/watch?v={video_id}",
+            'title': title,
+            'channel': channel,
+            'thumbnail': thumbnail,
+            'video_id': video_id
+        }
+    return None
+
+def _search_and_cache(key, ttl):
+    with youtube_limiter.slot():
+        try:
+            with metrics.timed("youtube"):
+                result = _search(key)
+        except Exception:
+            metrics.upstream_errors.inc("youtube")
+            raise
+    _search_cache.set(key, result, ttl)
+    return result
+
+def search_youtube(query, ttl=None):
+    """Search YouTube, answering repeated queries from the TTL cache"""
+    key = normalize_query(query)
+    if not key:
+        return None
+    cached = _search_cache.get(key, _MISS)
+    metrics.record_cache("youtube", cached is not _MISS)
+    if cached is not _MISS:
+        logger.debug(f"YouTube cache hit for '{key}'")
+        return cached
+    try:
+        return _search_flights.do(key, lambda: _search_and_cache(key, ttl))
+    except Overloaded:
+        raise
+    except Exception as e:
+        logger.error(f"Error in search_youtube: {e}")
+        return None
+
+def search_random_music():
+    """Search one of the RANDOM_MUSIC_QUERIES, normally served from the warmed cache"""
+    return search_youtube(random.choice(RANDOM_MUSIC_QUERIES), ttl=RANDOM_MUSIC_TTL)
+
+def _load_random_music(key):
+    """Copy a shared warmed result into the local cache; returns its age, or None if missing"""
+    raw = shared_store.get(RANDOM_MUSIC_NAMESPACE, key)
+    if raw is None:
+        return None
+    entry = json.loads(raw)
+    age = time.time() - entry['fetched_at']
+    if age >= RANDOM_MUSIC_TTL:
+        return None
+    _search_cache.set(key, entry['result'], RANDOM_MUSIC_TTL - age)
+    return age
+
+def _refresh_random_music(query, key):
+    result = _search(query)
+    shared_store.set(RANDOM_MUSIC_NAMESPACE, key, json.dumps({'result': result, 'fetched_at': time.time()}),
+                     ttl=RANDOM_MUSIC_TTL)
+    _search_cache.set(key, result, RANDOM_MUSIC_TTL)
+
+def _warm_random_music():
+    while True:
+        # Only the worker holding the lease searches; it is held for most of a TTL,
+        # so results older than half a TTL are refreshed well before they expire
+        try:
+            leader = shared_store.add(WARMUP_LEASE_NAMESPACE, "random_music", str(os.getpid()),
+                                      ttl=RANDOM_MUSIC_TTL * 0.9)
+        except Exception as e:
+            logger.error(f"Error claiming the YouTube warm-up lease: {e}")
+            leader = False
+        refreshed = 0
+        for query in RANDOM_MUSIC_QUERIES:
+            key = normalize_query(query)
+            try:
+                age = _load_random_music(key)
+            except Exception as e:
+                logger.error(f"Error loading warmed YouTube result for '{query}': {e}")
+                age = None
+            if not leader or (age is not None and age <= RANDOM_MUSIC_TTL / 2):
+                continue
+            try:
+                _refresh_random_music(query, key)
+                refreshed += 1
+            except Exception as e:
+                logger.error(f"Error warming YouTube cache for '{query}': {e}")
+                metrics.upstream_errors.inc("youtube")
+        if refreshed:
+            logger.info(f"Warmed YouTube cache with {refreshed} random music queries")
+        time.sleep(RANDOM_MUSIC_SYNC_SECONDS)
+
+_warmup_thread = None
+
+def start_warmup():
+    """Prefetch RANDOM_MUSIC_QUERIES in the background so "play music" never waits on the API"""
+    global _warmup_thread
+    if not YOUTUBE_API_KEY:
+        return
+    with _client_lock:
+        if _warmup_thread is None or not _warmup_thread.is_alive():
+            _warmup_thread = threading.Thread(target=_warm_random_music, name="youtube-warmup", daemon=True)
+            _warmup_thread.start()
@@ -67,7 +67,6 @@ const AudioEnhancer = {
     init() {
         this.setupMutationObserver();
         this.setupEventListeners();
-        this.startPeriodicCheck();
         this.setupPerformanceMonitor();
     },
 
@@ -124,14 +123,15 @@ const AudioEnhancer = {
         }
     },
 
-    // Start periodic check for new audio elements
-    startPeriodicCheck() {
-        setInterval(() => this.enhanceAllAudio(), 3000);
+    // Jessie's replies are trimmed and levelled on the server before caching
+    isPreprocessed(element) {
+        const src = element.currentSrc || element.src || '';
+        return src.includes('/static/audio/') || src.includes('/api/speak_stream');
     },
 
     // Process a single audio element
     processAudioElement(element, retryCount = 0) {
-        if (element.src && !element.audioContext) {
+        if (element.src && !element.audioContext && !this.isPreprocessed(element)) {
             try {
                 const startTime = performance.now();
                 console.log('Processing audio element:', element.src);
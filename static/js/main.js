@@ -11,6 +11,25 @@ document.addEventListener('DOMContentLoaded', () => {
     const micStatus = document.getElementById('mic-status');
     const suggestionContainer = document.getElementById('suggestion-container');
     
+    // Reply audio formats this browser can play, so the server can send smaller clips
+    const audioFormats = (() => {
+        const probe = new Audio();
+        const formats = [];
+        if (probe.canPlayType('audio/webm; codecs="opus"')) formats.push('opus');
+        if (probe.canPlayType('audio/ogg; codecs="opus"')) formats.push('ogg');
+        formats.push('mp3');
+        return formats;
+    })();
+    
+    // Lets the server answer "what time is it" in the user's timezone
+    function clientTime() {
+        let timezone = null;
+        try {
+            timezone = Intl.DateTimeFormat().resolvedOptions().timeZone || null;
+        } catch (e) {}
+        return { timezone: timezone, utc_offset: -new Date().getTimezoneOffset() };
+    }
+    
     // Global variables for YouTube functionality
     let isYouTubePlaying = false;
     let micWasActiveBeforeYouTube = false;
@@ -64,56 +83,117 @@ document.addEventListener('DOMContentLoaded', () => {
             recognition = new webkitSpeechRecognition();
             recognition.continuous = true;
             recognition.interimResults = false;
+        } else if (window.MediaRecorder && navigator.mediaDevices) {
+            // No Web Speech API: record short clips and transcribe them on the server
+            console.log('Using server-side speech recognition');
+            recognition = createServerRecognition();
+        } else {
+            micButton.style.display = 'none';
+            console.log('Speech recognition not supported');
+            return;
+        }
 
-            recognition.onstart = () => {
-                console.log('Recognition started');
-                voiceWave.classList.add('active');
-                micStatus.textContent = 'Listening...';
-            };
+        recognition.onstart = () => {
+            console.log('Recognition started');
+            voiceWave.classList.add('active');
+            micStatus.textContent = 'Listening...';
+        };
 
-            recognition.onend = () => {
-                console.log('Recognition ended, shouldListen:', shouldListen);
-                
-                // CRITICAL FIX: Check if manually stopped first
-                if (!shouldListen) {
-                    console.log("Mic was manually stopped - NOT restarting");
-                    voiceWave.classList.remove('active');
-                    micButton.classList.remove('active');
-                    micStatus.textContent = 'Microphone ready';
-                    return; // EXIT IMMEDIATELY - don't restart
-                }
-                
-                // Only restart if shouldListen is still true
-                console.log("Auto-restarting mic after browser timeout");
-                setTimeout(() => {
-                    if (shouldListen) { // Double-check still true
-                        try {
-                            recognition.start();
-                        } catch (e) {
-                            console.error('Error restarting recognition:', e);
-                            shouldListen = false; // Give up if error
-                            voiceWave.classList.remove('active');
-                            micButton.classList.remove('active');
-                        }
+        recognition.onend = () => {
+            console.log('Recognition ended, shouldListen:', shouldListen);
+            
+            // CRITICAL FIX: Check if manually stopped first
+            if (!shouldListen) {
+                console.log("Mic was manually stopped - NOT restarting");
+                voiceWave.classList.remove('active');
+                micButton.classList.remove('active');
+                micStatus.textContent = 'Microphone ready';
+                return; // EXIT IMMEDIATELY - don't restart
+            }
+            
+            // Only restart if shouldListen is still true
+            console.log("Auto-restarting mic after browser timeout");
+            setTimeout(() => {
+                if (shouldListen) { // Double-check still true
+                    try {
+                        recognition.start();
+                    } catch (e) {
+                        console.error('Error restarting recognition:', e);
+                        shouldListen = false; // Give up if error
+                        voiceWave.classList.remove('active');
+                        micButton.classList.remove('active');
                     }
-                }, 500);
-            };
+                }
+            }, 500);
+        };
 
-            recognition.onresult = (event) => {
-                const text = event.results[0][0].transcript;
-                console.log('Recognition result:', text);
-                userInput.value = text;
-                sendMessage();
-            };
+        recognition.onresult = (event) => {
+            const text = event.results[0][0].transcript;
+            console.log('Recognition result:', text);
+            userInput.value = text;
+            sendMessage();
+        };
 
-            recognition.onerror = (event) => {
-                console.error('Speech recognition error:', event.error);
-                micStatus.textContent = 'Error: ' + event.error;
-            };
-        } else {
-            micButton.style.display = 'none';
-            console.log('Speech recognition not supported');
-        }
+        recognition.onerror = (event) => {
+            console.error('Speech recognition error:', event.error);
+            micStatus.textContent = 'Error: ' + event.error;
+        };
+    }
+    
+    // Minimal stand-in for webkitSpeechRecognition backed by /api/transcribe.
+    // Each clip ends on stop() or after maxClipMs, then its transcript is sent.
+    function createServerRecognition() {
+        const maxClipMs = 8000;
+        const recognizer = { onstart: null, onend: null, onresult: null, onerror: null };
+        let recorder = null;
+        let clipTimer = null;
+        
+        recognizer.start = () => {
+            if (recorder) return;
+            navigator.mediaDevices.getUserMedia({ audio: true }).then(stream => {
+                const chunks = [];
+                recorder = new MediaRecorder(stream);
+                recorder.ondataavailable = (event) => {
+                    if (event.data.size) chunks.push(event.data);
+                };
+                recorder.onstop = async () => {
+                    clearTimeout(clipTimer);
+                    stream.getTracks().forEach(track => track.stop());
+                    const type = recorder.mimeType;
+                    recorder = null;
+                    try {
+                        if (chunks.length) {
+                            const response = await fetch('/api/transcribe', {
+                                method: 'POST',
+                                headers: { 'Content-Type': type },
+                                body: new Blob(chunks, { type: type })
+                            });
+                            const data = await response.json();
+                            if (data.error) {
+                                if (recognizer.onerror) recognizer.onerror({ error: data.error });
+                            } else if (data.text && recognizer.onresult) {
+                                recognizer.onresult({ results: [[{ transcript: data.text }]] });
+                            }
+                        }
+                    } catch (e) {
+                        if (recognizer.onerror) recognizer.onerror({ error: 'network' });
+                    }
+                    if (recognizer.onend) recognizer.onend();
+                };
+                recorder.start();
+                clipTimer = setTimeout(() => recognizer.stop(), maxClipMs);
+                if (recognizer.onstart) recognizer.onstart();
+            }).catch(() => {
+                if (recognizer.onerror) recognizer.onerror({ error: 'not-allowed' });
+                if (recognizer.onend) recognizer.onend();
+            });
+        };
+        
+        recognizer.stop = () => {
+            if (recorder && recorder.state !== 'inactive') recorder.stop();
+        };
+        
+        return recognizer;
     }
     
     // Initialize speech recognition
@@ -264,6 +344,8 @@ document.addEventListener('DOMContentLoaded', () => {
         if (window.Prism) {
             Prism.highlightAll();
         }
+        
+        return messageDiv;
     }
     
     // Function to format code blocks
@@ -294,23 +376,147 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
     
+    // Audio clips waiting to be played, in order
+    const audioQueue = [];
+    let audioPlaying = false;
+    let currentAudio = null;
+    
     // Function to play audio response
     function playAudioResponse(audioSrc) {
-        if (recognition) {
-            shouldListen = false;
-            recognition.stop();
+        audioQueue.push(audioSrc);
+        if (!audioPlaying) {
+            playNextAudio();
         }
-        const audio = new Audio(audioSrc);
-        audio.play().catch(e => console.error('Error playing audio:', e));
-        audio.onended = () => {
+    }
+    
+    function playNextAudio() {
+        const audioSrc = audioQueue.shift();
+        if (!audioSrc) {
+            // Queue drained, hand the mic back to the user
+            audioPlaying = false;
             if (recognition) {
                 shouldListen = true;
                 recognition.start();
                 micStatus.textContent = 'Listening...';
             }
+            return;
+        }
+        
+        if (!audioPlaying && recognition) {
+            shouldListen = false;
+            recognition.stop();
+        }
+        audioPlaying = true;
+        
+        const audio = new Audio();
+        currentAudio = audio;
+        // Streamed responses start playing as soon as the first chunk is buffered
+        audio.preload = 'auto';
+        audio.src = audioSrc;
+        audio.play().catch(e => {
+            console.error('Error playing audio:', e);
+            playNextAudio();
+        });
+        audio.onended = playNextAudio;
+    }
+    
+    // Drop queued clips and silence whatever is playing, including a video
+    function stopAllAudio() {
+        audioQueue.length = 0;
+        if (currentAudio) {
+            currentAudio.onended = null;
+            currentAudio.pause();
+            currentAudio = null;
+        }
+        const player = document.getElementById('youtube-player');
+        if (player) player.remove();
+        // An empty queue ends playback and hands the mic back
+        if (audioPlaying) playNextAudio();
+    }
+    
+    // Show a complete (non-streamed) reply
+    function handleReply(data) {
+        if (data.stop) {
+            stopAllAudio();
+            addMessage(data.response, 'bot');
+            return;
+        }
+        
+        // Handle YouTube URLs
+        if (data.youtube_url) {
+            playYouTubeInPlayer(data.youtube_url, data.youtube_metadata);
+            addMessage(data.response, 'bot');
+            return;
+        }
+        
+        // Add bot response to panel
+        addMessage(data.response, 'bot');
+        
+        // Play audio if available, preferring the streaming endpoint
+        if (data.audio_stream) {
+            playAudioResponse(data.audio_stream);
+        } else if (data.audio) {
+            playAudioResponse(data.audio);
+        }
+    }
+    
+    // Read the SSE reply stream: text arrives per sentence, audio follows per sentence
+    async function sendMessageStreaming(message, typingIndicator) {
+        const response = await fetch('/api/send_message_stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ message: message, audio_formats: audioFormats, ...clientTime() })
+        });
+        if (response.status === 503) {
+            // Server is shedding load; it still sends a reply to show
+            removeTypingIndicator(typingIndicator);
+            handleReply(await response.json());
+            return;
+        }
+        if (!response.ok || !response.body) {
+            throw new Error(`Stream request failed: ${response.status}`);
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let botText = '';
+        let botMessage = null;
+        
+        const handleEvent = (event) => {
+            removeTypingIndicator(typingIndicator);
+            if (event.type === 'reply' || event.type === 'error') {
+                handleReply(event);
+            } else if (event.type === 'text') {
+                botText = botText ? `${botText} ${event.text}` : event.text;
+                if (botMessage) botMessage.remove();
+                botMessage = addMessage(botText, 'bot');
+            } else if (event.type === 'audio') {
+                playAudioResponse(event.audio);
+            }
         };
+        
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const raw = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                if (raw.startsWith('data: ')) {
+                    handleEvent(JSON.parse(raw.slice(6)));
+                }
+            }
+        }
     }
     
+    const streamReplies = document.body.dataset.streamReplies === 'true' &&
+        window.ReadableStream && window.TextDecoder;
+    
     // Function to send message
     async function sendMessage() {
         const message = userInput.value.trim();
@@ -324,12 +530,17 @@ document.addEventListener('DOMContentLoaded', () => {
         const typingIndicator = showTypingIndicator();
         
         try {
+            if (streamReplies) {
+                await sendMessageStreaming(message, typingIndicator);
+                return;
+            }
+            
             const response = await fetch('/api/send_message', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ message: message })
+                body: JSON.stringify({ message: message, audio_formats: audioFormats, ...clientTime() })
             });
             
             const data = await response.json();
@@ -337,20 +548,7 @@ document.addEventListener('DOMContentLoaded', () => {
             // Remove typing indicator
             removeTypingIndicator(typingIndicator);
             
-            // Handle YouTube URLs
-            if (data.youtube_url) {
-                playYouTubeInPlayer(data.youtube_url, data.youtube_metadata);
-                addMessage(data.response, 'bot');
-                return;
-            }
-            
-            // Add bot response to panel
-            addMessage(data.response, 'bot');
-            
-            // Play audio if available
-            if (data.audio) {
-                playAudioResponse(data.audio);
-            }
+            handleReply(data);
             
         } catch (error) {
             console.error('Error:', error);
@@ -0,0 +1,141 @@
+# tests/test_chat_stream.py
+"""Streamed replies that don't finish must not break the chat for later turns"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from module import chat as chat_module
+from module.session import ChatSessionStore
+
+
+class IncompleteIterationError(Exception):
+    pass
+
+
+class BrokenResponseError(Exception):
+    pass
+
+
+class Content:
+    def __init__(self, role, text):
+        self.role = role
+        self.parts = [type("Part", (), {"text": text})()]
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class StreamedResponse:
+    """Like google-generativeai's streaming response: done only once fully iterated"""
+
+    def __init__(self, chunks, error=None, finish_reason="STOP"):
+        self._chunks = chunks
+        self._raise = error
+        self._finish_reason = finish_reason
+        self._done = False
+        self._error = None
+
+    def __iter__(self):
+        for text in self._chunks:
+            yield Chunk(text)
+        if self._raise:
+            self._error = self._raise
+            self._done = True
+            raise self._raise
+        self._done = True
+
+    @property
+    def candidates(self):
+        if not self._done:
+            raise IncompleteIterationError("Please let the response complete iteration")
+        return [type("Candidate", (), {"content": Content("model", "".join(self._chunks)),
+                                       "finish_reason": self._finish_reason})()]
+
+
+class FakeChat:
+    """Mirrors ChatSession.history/rewind from google-generativeai 0.3.2"""
+
+    def __init__(self, replies):
+        self._history = []
+        self._last_sent = None
+        self._last_received = None
+        self._replies = list(replies)
+
+    def send_message(self, message, stream=False):
+        self.history  # raises, like the library, while the last reply is broken
+        response = self._replies.pop(0)
+        self._last_sent = Content("user", message)
+        self._last_received = response
+        return response
+
+    @property
+    def history(self):
+        last = self._last_received
+        if last is None:
+            return self._history
+        candidate = last.candidates[0]
+        if candidate.finish_reason != "STOP":
+            last._error = RuntimeError(candidate.finish_reason)
+        if last._error is not None:
+            raise BrokenResponseError("Can not build a coherent chat history after a broken streaming response")
+        self._history.extend([self._last_sent, candidate.content])
+        self._last_sent = None
+        self._last_received = None
+        return self._history
+
+    @history.setter
+    def history(self, history):
+        self._history = list(history)
+        self._last_received = None
+
+    def rewind(self):
+        if self._last_received is None:
+            return self._history.pop(-2), self._history.pop()
+        result = self._last_sent, self._last_received.candidates[0].content
+        self._last_sent = None
+        self._last_received = None
+        return result
+
+
+def texts(chat):
+    return [content.parts[0].text for content in chat.history]
+
+
+def test_abandoned_stream_is_dropped():
+    chat = FakeChat([StreamedResponse(["Hello ", "there."]), StreamedResponse(["Next."])])
+    stream = chat_module.get_response_stream(chat, "first")
+    assert next(stream) == "Hello "
+    stream.close()  # client disconnected mid-reply
+
+    assert "".join(chat_module.get_response_stream(chat, "second")) == "Next."
+    assert texts(chat) == ["second", "Next."]
+
+
+def test_stream_error_is_dropped():
+    chat = FakeChat([StreamedResponse(["Partial "], error=ConnectionError("reset")), StreamedResponse(["Fine."])])
+    assert "".join(chat_module.get_response_stream(chat, "first")) == "Partial "
+
+    assert "".join(chat_module.get_response_stream(chat, "second")) == "Fine."
+    assert texts(chat) == ["second", "Fine."]
+
+
+def test_safety_stop_is_dropped():
+    chat = FakeChat([StreamedResponse(["Blocked"], finish_reason="SAFETY"), StreamedResponse(["Fine."])])
+    "".join(chat_module.get_response_stream(chat, "first"))
+
+    assert "".join(chat_module.get_response_stream(chat, "second")) == "Fine."
+    assert texts(chat) == ["second", "Fine."]
+
+
+def test_session_store_keeps_the_turns_own_error():
+    chat = FakeChat([StreamedResponse(["Hello"])])
+    store = ChatSessionStore(lambda: chat)
+    with pytest.raises(KeyError):
+        with store.use("session"):
+            chat.send_message("hi", stream=True)  # left pending, so history raises
+            raise KeyError("turn failed")